@@ -0,0 +1,28 @@
+"""Checks the page defs and rendered pages against the pages in WordPress without uploading anything.
+
+The checks run against the local page catalog in `./database/page_catalog.json` (See `src/upload/drift.py`).
+The catalog is synced if it is older than a day, or always with `--refresh`.
+If WordPress cannot be reached, the cached catalog is used regardless of its age.
+Exits with status 1 if any page differs."""
+
+import argparse
+import sys
+
+from src.upload.drift import get_drift
+from src.upload.upload import get_catalog
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Sync the catalog even if the cache is recent.",
+    )
+    args = parser.parse_args()
+
+    catalog = get_catalog(refresh=args.refresh)
+    drift = get_drift(catalog)
+    for d in sorted(drift, key=lambda d: d.page_id):
+        print(f"Page {d.page_id}: {d.message}")
+    print(f"{len(drift)} differences (Catalog synced at {catalog.synced})")
+    sys.exit(1 if drift else 0)
@@ -0,0 +1,111 @@
+"""Renders and/or uploads selected pages, including all pages that depend on them.
+
+Pages are selected by their page ID or a glob of their file name (e.g. `1234`, `parkour*`) and/or by `--type`.
+Without any selection, all pages are processed.
+Pages that display data of the selected pages (e.g. overview pages with `<allCourses>`) are included automatically,
+unless `--no-dependents` is passed.
+
+Commands:
+- `render`: Renders the selected pages.
+- `upload`: Uploads the already rendered selected pages.
+- `publish`: Renders and then uploads the selected pages.
+
+The metrics of each run are written to `./database/run_report.json` and `./database/metrics.prom`
+(See `scripts/pipeline.py`).
+"""
+
+import argparse
+from pathlib import Path
+
+from src.generation.dedicated.all_pages import VALID_PAGE_TYPES
+from src.generation.page_weight import WeightBudget
+from src.generation.render_page_defs import RenderOptions, render_page_defs
+from src.generation.selection import get_page_infos, select_pages, get_dependents
+from src.upload.upload import update_all_content
+from src.util.metrics import record_run
+from util.path import Files
+
+
+def add_selection_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments to select pages to the `parser`."""
+    parser.add_argument(
+        "pages",
+        nargs="*",
+        help="Page IDs or globs of page def file names.",
+    )
+    parser.add_argument(
+        "--type",
+        dest="page_types",
+        action="append",
+        choices=VALID_PAGE_TYPES,
+        help="Select all pages of this type. Can be passed multiple times.",
+    )
+    parser.add_argument(
+        "--no-dependents",
+        action="store_true",
+        help="Do not include the pages that depend on the selected pages.",
+    )
+    parser.add_argument(
+        "--prometheus-file",
+        type=Path,
+        default=Files.metrics,
+        help="The file the Prometheus metrics of the run are written to "
+        "(e.g. in the directory of the node exporter's textfile collector).",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = commands.add_parser("render", help="Render the selected pages.")
+    add_selection_arguments(render_parser)
+    RenderOptions.add_arguments(render_parser)
+    WeightBudget.add_arguments(render_parser)
+
+    upload_parser = commands.add_parser("upload", help="Upload the selected pages.")
+    add_selection_arguments(upload_parser)
+
+    publish_parser = commands.add_parser(
+        "publish", help="Render and upload the selected pages."
+    )
+    add_selection_arguments(publish_parser)
+    RenderOptions.add_arguments(publish_parser)
+    WeightBudget.add_arguments(publish_parser)
+
+    for p in (upload_parser, publish_parser):
+        p.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip pages that were already uploaded with the same content in the last run.",
+        )
+
+    args = parser.parse_args()
+
+    with record_run(prometheus_file=args.prometheus_file):
+        infos = get_page_infos()
+        selected = select_pages(infos, args.pages, args.page_types)
+        dependents = set() if args.no_dependents else get_dependents(infos, selected)
+
+        for info in sorted(selected, key=lambda i: i.page_id):
+            print(f"Selected {info.page_id} ({info.title})")
+        for info in sorted(dependents, key=lambda i: i.page_id):
+            print(f"Dependent {info.page_id} ({info.title})")
+
+        # Keep the order of the page defs, so the output is the same as for the full pipeline.
+        files = [i.file for i in infos if i in selected or i in dependents]
+
+        if args.command in ("render", "publish"):
+            print("Starting Conversion")
+            render_page_defs(
+                files,
+                RenderOptions.from_arguments(args),
+                WeightBudget.from_arguments(args),
+            )
+            print("Finished Conversion")
+        if args.command in ("upload", "publish"):
+            print("Starting Upload")
+            update_all_content(resume=args.resume, pages=files)
+            print("Finished Upload")
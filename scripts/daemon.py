@@ -0,0 +1,29 @@
+"""Starts the render daemon, which keeps the database in memory and renders pages on request.
+See `src/daemon/daemon.py` for the available routes.
+
+Example: `curl -X POST http://127.0.0.1:8765/render/dirty`"""
+
+import argparse
+
+from src.daemon.daemon import serve
+from src.generation.render_page_defs import RenderOptions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1", help="The address to bind to.")
+    parser.add_argument("--port", type=int, default=8765, help="The port to bind to.")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="The interval in seconds in which the files are checked for changes.",
+    )
+    RenderOptions.add_arguments(parser)
+    args = parser.parse_args()
+
+    serve(
+        RenderOptions.from_arguments(args),
+        host=args.host,
+        port=args.port,
+        interval=args.interval,
+    )
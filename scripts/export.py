@@ -0,0 +1,25 @@
+"""Exports all rendered pages as a static website to `./database/export`.
+Render the pages first, e.g. with `./scripts/cli.py render`.
+See `src/export/static_export.py` for the structure of the export and how to serve it with nginx."""
+
+import argparse
+
+from src.export.static_export import export_site
+from util.path import Folders
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "base_url", help="The URL under which the export will be served."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The amount of pages exported in parallel. Defaults to a value based on the amount of CPUs.",
+    )
+    args = parser.parse_args()
+
+    print("Starting Export")
+    exported = export_site(args.base_url, jobs=args.jobs)
+    print(f"Finished Export: {len(exported)} files in {Folders.export}")
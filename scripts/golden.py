@@ -0,0 +1,218 @@
+"""Renders the golden corpus in `./golden` and compares the output byte for byte with the expected HTML.
+
+The corpus consists of a database (`./golden/database`) with page defs that cover all element shapes of
+`help/Example Page Def.xml`. The expected HTML is stored in `./golden/expected/<variant>/<pageId>.html`
+for each variant of the render options:
+- `default`: No optional stages, i.e. the HTML as it was always rendered.
+- `optimized`: All optional stages (`--minify --prune-css --inline-icons`).
+
+Each variant is rendered in several modes, all of which must produce identical output:
+- `uncached`: Sequentially without the fragment cache.
+- `cached`: Sequentially with a warm fragment cache (every page is rendered twice, the second pass is compared).
+- `parallel`: All pages at once in multiple threads sharing the fragment cache.
+
+Pass `--against <revision>` to additionally render the `default` variant with the code of a git revision
+(e.g. `HEAD` for the last commit) and compare it with the current code.
+Pass `--update` to overwrite the expected HTML after an intended change of the output.
+
+Every render runs in a separate process in a temporary copy of the corpus, so nothing in `./database` is touched.
+Exits with status 1 if any output differs."""
+
+import argparse
+import difflib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+GOLDEN = Path() / "golden"
+VARIANTS = {
+    "default": [],
+    "optimized": ["--minify", "--prune-css", "--inline-icons"],
+}
+MODES = ("uncached", "cached", "parallel")
+
+
+def run_worker(mode: str, flags: list[str]) -> None:
+    """Renders all pages in the current working directory in the `mode`.
+    This runs in a subprocess with the code under test on the `sys.path`."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import src.generation.render_page_defs as render
+    from util.path import Folders, get_page_files
+
+    Folders.rendered.mkdir(parents=True, exist_ok=True)
+    if flags:
+        parser = argparse.ArgumentParser()
+        render.RenderOptions.add_arguments(parser)
+        options = render.RenderOptions.from_arguments(parser.parse_args(flags))
+        render_page = lambda file: render.render_page_def(file, options)
+    else:
+        # Older revisions do not have any options.
+        render_page = render.render_page_def
+
+    cache = getattr(render, "FRAGMENT_CACHE", None)
+    files = sorted(get_page_files())
+    if mode == "uncached":
+        if cache is not None:
+            cache.maxsize = 0
+        for file in files:
+            render_page(file)
+    elif mode == "cached":
+        for _ in range(2):
+            for file in files:
+                render_page(file)
+    elif mode == "parallel":
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(render_page, files))
+    else:
+        raise ValueError(f'Unknown mode "{mode}".')
+
+
+def render_corpus(code_root: Path, mode: str, flags: list[str]) -> dict[str, str]:
+    """Renders the corpus with the code in the `code_root` and returns the HTML of each page by its file name.
+
+    :raises RuntimeError:
+        When the rendering fails."""
+    with tempfile.TemporaryDirectory() as work:
+        work = Path(work)
+        shutil.copytree(GOLDEN / "database", work / "database")
+        shutil.copytree(code_root / "res", work / "res")
+
+        env = os.environ | {
+            "PYTHONPATH": os.pathsep.join([str(code_root), str(code_root / "src")]),
+            # Fixed values, so the output does not depend on the local configuration.
+            "ORIGIN_URL": "https://example.com",
+            "IMAGE_BASE_URL": "https://example.com/images",
+        }
+        result = subprocess.run(
+            [sys.executable, Path(__file__).absolute(), "--worker", mode, *flags],
+            cwd=work,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Rendering in mode {mode} failed:\n{result.stderr}"
+            )
+
+        rendered = work / "database" / "rendered"
+        return {
+            f.name: f.read_text(encoding="utf-8") for f in sorted(rendered.iterdir())
+        }
+
+
+def read_expected(variant: str) -> dict[str, str]:
+    """Returns the expected HTML of each page of the `variant` by its file name."""
+    folder = GOLDEN / "expected" / variant
+    if not folder.exists():
+        return dict()
+    return {f.name: f.read_text(encoding="utf-8") for f in sorted(folder.iterdir())}
+
+
+def write_expected(variant: str, pages: dict[str, str]) -> None:
+    """Replaces the expected HTML of the `variant` with the `pages`."""
+    folder = GOLDEN / "expected" / variant
+    shutil.rmtree(folder, ignore_errors=True)
+    folder.mkdir(parents=True)
+    for name, content in pages.items():
+        # Write the exact bytes, without translating newlines.
+        (folder / name).write_bytes(content.encode("utf-8"))
+
+
+def _split(html: str) -> list[str]:
+    """Splits the `html` between tags, as the rendered HTML is mostly on a single line."""
+    return html.replace("><", ">\n<").splitlines(keepends=True)
+
+
+def compare(expected: dict[str, str], actual: dict[str, str], label: str) -> bool:
+    """Prints the differences between the `expected` and `actual` pages and returns whether they are identical."""
+    identical = True
+    for name in sorted(expected.keys() | actual.keys()):
+        if name not in actual:
+            print(f"[{label}] {name}: Missing")
+        elif name not in expected:
+            print(f"[{label}] {name}: Unexpected")
+        elif expected[name] != actual[name]:
+            print(f"[{label}] {name}: Differs")
+            sys.stdout.writelines(
+                difflib.unified_diff(
+                    _split(expected[name]),
+                    _split(actual[name]),
+                    fromfile=f"expected/{name}",
+                    tofile=f"{label}/{name}",
+                )
+            )
+        else:
+            continue
+        identical = False
+    return identical
+
+
+def render_revision(revision: str) -> dict[str, str]:
+    """Renders the `default` variant with the code of the git `revision`."""
+    with tempfile.TemporaryDirectory() as folder:
+        worktree = Path(folder) / "worktree"
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", worktree, revision],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            return render_corpus(worktree, "uncached", VARIANTS["default"])
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", worktree],
+                check=True,
+                capture_output=True,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Overwrite the expected HTML with the output of the uncached mode.",
+    )
+    parser.add_argument(
+        "--against",
+        metavar="REVISION",
+        help="Also compare the current code with the code of this git revision.",
+    )
+    parser.add_argument("--worker", metavar="MODE", help=argparse.SUPPRESS)
+    args, flags = parser.parse_known_args()
+
+    if args.worker:
+        run_worker(args.worker, flags)
+        sys.exit()
+
+    code_root = Path(__file__).absolute().parent.parent
+    success = True
+    for variant, variant_flags in VARIANTS.items():
+        reference = render_corpus(code_root, "uncached", variant_flags)
+        if args.update:
+            write_expected(variant, reference)
+            print(f"Updated {len(reference)} expected pages of {variant}")
+        else:
+            success &= compare(read_expected(variant), reference, f"{variant}/uncached")
+
+        for mode in MODES[1:]:
+            success &= compare(
+                reference,
+                render_corpus(code_root, mode, variant_flags),
+                f"{variant}/{mode}",
+            )
+
+        if args.against and variant == "default":
+            success &= compare(
+                render_revision(args.against), reference, f"{variant}/{args.against}"
+            )
+
+    print("All outputs are identical" if success else "Outputs differ")
+    sys.exit(0 if success else 1)
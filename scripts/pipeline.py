@@ -1,13 +1,49 @@
 """Runs the entire conversion and upload pipeline for all defined pages in `./database/pages`.
-This will first convert all pages in bulk and then upload them."""
+This will first convert all pages in bulk and then upload them.
 
-from src.generation.render_page_defs import render_all_page_defs
+Pass `--resume` to continue the last upload run instead of uploading all pages again.
+Pass `--minify` to minify the rendered HTML before it is stored and uploaded.
+Pass `--prune-css` to only embed the CSS rules each page actually uses.
+Pass `--inline-icons` to replace the icon font with the SVGs vendored in `./res/icons`.
+Pass `--page-budget BYTES` and/or `--part-budget PART=BYTES` to report pages that are too large
+and `--enforce-budget` to stop before the upload if there are any (See `./database/page_weights.json`).
+
+The metrics of each run are written to `./database/run_report.json` and as Prometheus textfile
+to `./database/metrics.prom` (or the file passed as `--prometheus-file`)."""
+
+import argparse
+from pathlib import Path
+
+from src.generation.page_weight import WeightBudget
+from src.generation.render_page_defs import render_all_page_defs, RenderOptions
 from src.upload.upload import update_all_content
+from src.util.metrics import record_run
+from util.path import Files
 
 if __name__ == "__main__":
-    print("Starting Conversion")
-    render_all_page_defs()
-    print("Finished Conversion")
-    print("Starting Upload")
-    update_all_content()
-    print("Finished Upload")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip pages that were already uploaded with the same content in the last run.",
+    )
+    RenderOptions.add_arguments(parser)
+    WeightBudget.add_arguments(parser)
+    parser.add_argument(
+        "--prometheus-file",
+        type=Path,
+        default=Files.metrics,
+        help="The file the Prometheus metrics of the run are written to "
+        "(e.g. in the directory of the node exporter's textfile collector).",
+    )
+    args = parser.parse_args()
+
+    with record_run(prometheus_file=args.prometheus_file):
+        print("Starting Conversion")
+        render_all_page_defs(
+            RenderOptions.from_arguments(args), WeightBudget.from_arguments(args)
+        )
+        print("Finished Conversion")
+        print("Starting Upload")
+        update_all_content(resume=args.resume)
+        print("Finished Upload")
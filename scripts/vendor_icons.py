@@ -0,0 +1,99 @@
+"""Vendors the Material icons used by the rendered pages as SVG files into `./res/icons`.
+
+The icons are extracted from the Material Symbols variable font, which can be downloaded from
+https://github.com/google/material-design-icons/tree/master/variablefont
+(Use `MaterialSymbolsOutlined[FILL,GRAD,opsz,wght].ttf` and the matching `.codepoints` file.)
+
+By default, the icon names are collected from all pages in `./database/rendered`,
+so render the pages (without `--inline-icons`) before running this.
+Additional icon names can be passed explicitly.
+
+This requires `fonttools`, which is not needed for anything else and thus not part of the requirements.
+"""
+
+import argparse
+from pathlib import Path
+
+from src.generation.icons import ICON_CLASSES, get_used_icons, get_icon_file
+from util.path import Folders
+
+FILL_BY_CLASS = {
+    "material-icons": 1,
+    "material-icons-outlined": 0,
+}
+"""The value of the `FILL` axis of the variable font that matches the look of each icon class."""
+
+
+def read_codepoints(file: Path) -> dict[str, int]:
+    """Reads the `.codepoints` file of the font as `name:codepoint`-mapping."""
+    codepoints = dict()
+    for line in open(file, encoding="utf-8"):
+        if line.strip() == "":
+            continue
+        name, codepoint = line.split()
+        codepoints[name] = int(codepoint, 16)
+    return codepoints
+
+
+def _format_number(value: float) -> str:
+    """Formats the coordinate `value` as integer.
+    The glyphs are defined on a 960 unit grid, so the rounding is not visible at any sensible icon size."""
+    return str(round(value))
+
+
+def vendor_icons(font_file: Path, codepoints_file: Path, icons: set[tuple[str, str]]) -> None:
+    """Extracts the `icons` (as `(class, name)`) from the font and stores them as SVG."""
+    from fontTools.pens.svgPathPen import SVGPathPen
+    from fontTools.pens.transformPen import TransformPen
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    codepoints = read_codepoints(codepoints_file)
+
+    for klass in ICON_CLASSES:
+        names = sorted(name for k, name in icons if k == klass)
+        if not names:
+            continue
+
+        font = instancer.instantiateVariableFont(
+            TTFont(font_file),
+            {"FILL": FILL_BY_CLASS[klass], "GRAD": 0, "opsz": 24, "wght": 400},
+        )
+        glyphs = font.getGlyphSet()
+        cmap = font.getBestCmap()
+        size = font["head"].unitsPerEm
+
+        for name in names:
+            if name not in codepoints:
+                raise ValueError(f'Unknown icon: "{name}".')
+            pen = SVGPathPen(glyphs, ntos=_format_number)
+            # Font coordinates point upward, SVG coordinates downward.
+            glyphs[cmap[codepoints[name]]].draw(TransformPen(pen, (1, 0, 0, -1, 0, 0)))
+
+            file = get_icon_file(klass, name)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            with open(file, "w", encoding="utf-8") as stream:
+                stream.write(
+                    f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 -{size} {size} {size}">'
+                    f'<path d="{pen.getCommands()}"/></svg>\n'
+                )
+            print(f"Vendored {klass}/{name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("font", type=Path, help="The Material Symbols variable font.")
+    parser.add_argument("codepoints", type=Path, help="The `.codepoints` file of the font.")
+    parser.add_argument(
+        "icons",
+        nargs="*",
+        help='Additional icons as "<class>/<name>", e.g. "material-icons-outlined/face".',
+    )
+    args = parser.parse_args()
+
+    used = set()
+    for rendered in Folders.rendered.glob("*.html"):
+        used |= get_used_icons(open(rendered, encoding="utf-8").read())
+    used |= {tuple(i.split("/", 1)) for i in args.icons}
+
+    vendor_icons(args.font, args.codepoints, used)
@@ -0,0 +1,317 @@
+"""A long-lived render daemon that serves render requests over a local HTTP API.
+
+The daemon keeps the parsed database, the page index, the event store and the fragment cache in memory,
+so a render request only pays for the rendering itself.
+It watches the page defs, the database and the resources for changes and keeps track of the pages
+that need to be rendered again ("dirty" pages).
+
+Routes:
+- `GET /status`: The dirty pages and cache statistics.
+- `POST /render/page/<pageId>`: Renders a single page.
+- `POST /render/dirty`: Renders all pages affected by changes since they were last rendered.
+- `POST /render/all`: Renders all pages.
+
+All responses are JSON.
+"""
+
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from src.generation.database_parse import get_title_and_id, reload_database
+from src.generation.fragment_cache import FRAGMENT_CACHE
+from src.generation.icons import load_icon
+from src.generation.render_page_defs import (
+    RenderOptions,
+    render_page_def,
+    render_all_page_defs,
+)
+from util.path import Folders, get_page_files
+
+AGGREGATE_TAGS = ("allCourses", "allAux", "allEventDates")
+"""Tags that render data of other pages. Pages with these tags are affected by changes to any page."""
+
+
+class UnknownPageError(KeyError):
+    """Raised when a page is requested that is not defined."""
+
+
+class FileWatcher:
+    """Detects changed, added and removed files by polling their modification times.
+
+    :param roots:
+        The files and folders to watch. Folders are watched recursively.
+    """
+
+    def __init__(self, roots: list[Path]):
+        self.roots = roots
+        self._mtimes = self._scan()
+
+    def _scan(self) -> dict[Path, int]:
+        """Returns the modification time of every watched file."""
+        mtimes = dict()
+        for root in self.roots:
+            files = root.rglob("*") if root.is_dir() else [root]
+            for file in files:
+                if file.is_file():
+                    mtimes[file] = file.stat().st_mtime_ns
+        return mtimes
+
+    def poll(self) -> set[Path]:
+        """Returns all files that changed, were added or were removed since the last poll."""
+        mtimes = self._scan()
+        changed = {
+            f
+            for f in mtimes.keys() | self._mtimes.keys()
+            if mtimes.get(f) != self._mtimes.get(f)
+        }
+        self._mtimes = mtimes
+        return changed
+
+    def forget(self, files: set[Path]) -> None:
+        """Reports the `files` as changed again on the next poll, e.g. when processing their change failed."""
+        for file in files:
+            self._mtimes.pop(file, None)
+
+
+def _is_aggregate_page(file: Path) -> bool:
+    """Whether the page def in the `file` renders data of other pages."""
+    content = open(file, encoding="utf-8").read()
+    return any(f"<{tag}" in content for tag in AGGREGATE_TAGS)
+
+
+class RenderDaemon:
+    """Keeps the rendering state in memory and tracks the pages that need to be rendered again.
+
+    :param options:
+        The options used for all renders.
+    """
+
+    def __init__(self, options: RenderOptions = RenderOptions()):
+        self.options = options
+        self.lock = threading.Lock()
+        self.watcher = FileWatcher(
+            [
+                Folders.pages,
+                Folders.database / "contacts.xml",
+                Folders.database / "locations.xml",
+                Folders.database / "event_dates.csv",
+                Folders.images,
+                Folders.res,
+            ]
+        )
+        self.page_files: dict[str, Path] = self._get_page_files()
+        # Nothing is known about the existing output, so initially all pages are dirty.
+        self.dirty: set[Path] = set(self.page_files.values())
+        self.error: str | None = None
+        """The error of the last failed reload, e.g. of a malformed file that is still being edited."""
+
+    @staticmethod
+    def _get_page_files() -> dict[str, Path]:
+        """Returns all page def files mapped by their page ID."""
+        return {get_title_and_id(f)[1]: f for f in get_page_files()}
+
+    def refresh(self) -> None:
+        """Checks for changed files, reloads the affected data and marks the affected pages as dirty.
+
+        :raises Exception:
+            When the changed files cannot be loaded. They are loaded again on the next refresh."""
+        with self.lock:
+            changed = self.watcher.poll()
+            if not changed:
+                return
+
+            try:
+                reload_database()
+                self.page_files = self._get_page_files()
+            except Exception as e:
+                self.watcher.forget(changed)
+                self.error = repr(e)
+                raise
+            self.error = None
+            # Vendored icons are cached as well and may have changed.
+            load_icon.cache_clear()
+            pages = set(self.page_files.values())
+
+            changed_pages = {f for f in changed if f.parent == Folders.pages}
+            if changed - changed_pages:
+                # Shared data and resources may affect any page.
+                self.dirty = pages
+            else:
+                self.dirty |= changed_pages | {p for p in pages if _is_aggregate_page(p)}
+            self.dirty &= pages
+
+    def render_page(self, page_id: str) -> list[str]:
+        """Renders the page with the `page_id`.
+
+        :raises UnknownPageError:
+            When no page with the `page_id` is defined."""
+        self.refresh()
+        with self.lock:
+            file = self.page_files.get(page_id)
+            if file is None:
+                raise UnknownPageError(page_id)
+            render_page_def(file, self.options)
+            self.dirty.discard(file)
+        return [page_id]
+
+    def render_dirty(self) -> list[str]:
+        """Renders all dirty pages."""
+        self.refresh()
+        with self.lock:
+            rendered = list()
+            for page_id, file in sorted(self.page_files.items()):
+                if file in self.dirty:
+                    render_page_def(file, self.options)
+                    self.dirty.discard(file)
+                    rendered.append(page_id)
+        return rendered
+
+    def render_all(self) -> list[str]:
+        """Renders all pages."""
+        self.refresh()
+        with self.lock:
+            render_all_page_defs(self.options)
+            self.dirty.clear()
+            return sorted(self.page_files)
+
+    def status(self) -> dict:
+        """Returns the dirty pages, the error of the last failed reload and the statistics of the fragment cache."""
+        try:
+            self.refresh()
+        except Exception:
+            # The error is part of the status, the changed files are loaded again on the next refresh.
+            pass
+        with self.lock:
+            return {
+                "pages": len(self.page_files),
+                "error": self.error,
+                "dirty": sorted(i for i, f in self.page_files.items() if f in self.dirty),
+                "fragment_cache": {
+                    "size": len(FRAGMENT_CACHE),
+                    "hits": FRAGMENT_CACHE.hits,
+                    "misses": FRAGMENT_CACHE.misses,
+                    "hit_rate": FRAGMENT_CACHE.hit_rate,
+                },
+            }
+
+    def watch(self, interval: float) -> None:
+        """Checks for changes every `interval` seconds in a background thread."""
+
+        def loop():
+            """Refresh until the process ends."""
+            error = None
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                    error = None
+                except Exception as e:
+                    # Keep watching, the file is most likely fixed with the next save.
+                    # Only log each error once, as the failed files are retried on every refresh.
+                    if repr(e) != error:
+                        error = repr(e)
+                        print(f"Failed to reload the changed files: {error}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Dispatches the API routes to the `RenderDaemon` of the server."""
+
+    server: "RenderServer"
+
+    def _respond(self, status: HTTPStatus, data: dict) -> None:
+        """Sends the `data` as JSON."""
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, handler) -> None:
+        """Runs the `handler` and responds with the data it returns, or the error it raises."""
+        try:
+            data = handler()
+        except UnknownPageError as e:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown page: {e}"})
+            return
+        except Exception as e:
+            self._respond(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(e)})
+            return
+        self._respond(HTTPStatus.OK, data)
+
+    def _render(self, render) -> None:
+        """Runs the `render` function and responds with the rendered page IDs."""
+        start = time.perf_counter()
+
+        def handler():
+            """Render and measure the duration."""
+            rendered = render()
+            return {"rendered": rendered, "duration": time.perf_counter() - start}
+
+        self._handle(handler)
+
+    # noinspection PyPep8Naming
+    # (The name is defined by the base class)
+    def do_GET(self) -> None:
+        """Handles the `GET` routes."""
+        if self.path == "/status":
+            self._handle(self.server.daemon.status)
+        else:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown route: {self.path}"})
+
+    # noinspection PyPep8Naming
+    # (The name is defined by the base class)
+    def do_POST(self) -> None:
+        """Handles the `POST` routes."""
+        daemon = self.server.daemon
+        if self.path == "/render/all":
+            self._render(daemon.render_all)
+        elif self.path == "/render/dirty":
+            self._render(daemon.render_dirty)
+        elif self.path.startswith("/render/page/"):
+            page_id = self.path.removeprefix("/render/page/")
+            self._render(lambda: daemon.render_page(page_id))
+        else:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown route: {self.path}"})
+
+
+class RenderServer(ThreadingHTTPServer):
+    """The HTTP server of the `daemon`."""
+
+    def __init__(self, daemon: RenderDaemon, host: str, port: int):
+        super().__init__((host, port), _RequestHandler)
+        self.daemon = daemon
+
+
+def serve(
+    options: RenderOptions = RenderOptions(),
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    interval: float = 1.0,
+) -> None:
+    """Starts the daemon and serves requests until the process is interrupted.
+
+    :param options:
+        The options used for all renders.
+    :param host:
+        The address to bind to. Keep this local, as the API is not authenticated.
+    :param port:
+        The port to bind to.
+    :param interval:
+        The interval in seconds in which the files are checked for changes.
+    """
+    daemon = RenderDaemon(options)
+    daemon.watch(interval)
+    with RenderServer(daemon, host, port) as server:
+        print(f"Render daemon listening on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -32,6 +32,18 @@ def horizontal_line(
     return h("hr", style=style)
 
 
+def _image_style(center: bool) -> dict[str, str | int]:
+    """The style of an image that is either centered or right-aligned."""
+    # Centered images are a centerpiece and should be wide.
+    # Side images are just an extra and should be narrow.
+    return {
+        "width": "80%" if center else "35%",
+        "height": "auto",
+        "box-shadow": "0 4px 10px rgba(0, 0, 0, 0.3)",
+        "border-radius": 3,
+    }
+
+
 def image(link: str, *, center: bool) -> H:
     """Embeds the link as image with one of two styles (centered or right-aligned).
     :param link:
@@ -45,14 +57,63 @@ def image(link: str, *, center: bool) -> H:
                 klass="aligncenter" if center else "alignright",
                 src=link,
                 alt="",
-                # Centered images are a centerpiece and should be wide.
-                # Side images are just an extra and should be narrow.
-                style={
-                    "width": "80%" if center else "35%",
-                    "height": "auto",
-                    "box-shadow": "0 4px 10px rgba(0, 0, 0, 0.3)",
-                    "border-radius": 3,
-                },
+                style=_image_style(center),
+            )
+        )
+    )
+
+
+def responsive_image(
+    link: str,
+    *,
+    src: str,
+    srcset: str,
+    sources: dict[str, str],
+    sizes: str,
+    width: int,
+    height: int,
+    center: bool,
+) -> H:
+    """Embeds an image in multiple widths and formats with the same styles as `image()`.
+    The browser picks the smallest variant that suffices for the displayed size.
+
+    :param link:
+        The link to the full-size image.
+    :param src:
+        The image for browsers without `srcset` support.
+    :param srcset:
+        The widths of the image in its fallback format.
+    :param sources:
+        The widths of the image in more efficient formats as `mimetype:srcset`-mapping.
+        Browsers use the first format they support.
+    :param sizes:
+        The displayed width of the image.
+    :param width:
+        The intrinsic width of the image, to reserve the space before it is loaded.
+    :param height:
+        The intrinsic height of the image, to reserve the space before it is loaded.
+    :param center:
+        Whether to display the image as centered or right-aligned."""
+    return h("p")(
+        h("a", href=link)(
+            h("picture")(
+                (
+                    h("source", type=mimetype, srcset=srcset_, sizes=sizes)
+                    for mimetype, srcset_ in sources.items()
+                ),
+                h(
+                    "img",
+                    klass="aligncenter" if center else "alignright",
+                    src=src,
+                    srcset=srcset,
+                    sizes=sizes,
+                    width=width,
+                    height=height,
+                    loading="lazy",
+                    decoding="async",
+                    alt="",
+                    style=_image_style(center),
+                ),
             )
         )
     )
@@ -0,0 +1,203 @@
+"""Export of the rendered pages as a static website that can be served without WordPress (e.g. by nginx).
+
+Each rendered page is wrapped into a standalone HTML document at `./database/export/<pageId>/index.html`.
+Links between the pages are rewritten to point to the exported pages instead of WordPress.
+Additionally, an `index.html` that lists all pages and a `sitemap.xml` are generated.
+
+Every file is precompressed as `.gz` and `.br` sibling (for nginx' `gzip_static` and `brotli_static`).
+Brotli requires the `Brotli` package and is skipped if it is not installed.
+The compressed files are byte-for-byte reproducible, so unchanged pages produce unchanged files.
+
+The ETag of each file is its content hash. They are written as nginx `map` to `etags.conf`, keyed by the URIs under
+the base URL of the export, so they stay stable across exports (nginx' own ETags depend on the modification time).
+The ETags are weak, as the precompressed siblings are served under the same URI with the same ETag,
+but strong ETags must differ for each content coding:
+
+    map $uri $static_etag { include /path/to/export/etags.conf; }
+    etag off;
+    add_header ETag $static_etag;
+"""
+
+import gzip
+import hashlib
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from tinyhtml import html, raw
+
+from src.generation.database_parse import ID_TO_TITLE
+from src.upload.upload import get_page_url
+from src.util.tinyhtml_extended import h
+from util.path import Folders, get_page_file_name
+
+_HEAD = re.compile(r"<head>(.*?)</head>", re.DOTALL)
+
+
+@dataclass(kw_only=True)
+class ExportedFile:
+    """A file of the export with the hash of its content."""
+
+    path: str
+    """The path relative to the export folder, using "/" as separator."""
+    etag: str
+
+
+def get_etag(content: bytes) -> str:
+    """Returns the weak ETag for the `content`, which is shared by all of its content codings."""
+    return 'W/"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+def _rewrite_links(content: str, base_path: str) -> str:
+    """Points all links to exported pages at the export instead of WordPress."""
+    prefix, suffix = get_page_url("\0").split("\0")
+    link = re.compile(f'href="{re.escape(prefix)}([^"]+){re.escape(suffix)}"')
+
+    def replace(match: re.Match) -> str:
+        """Replace the link if it points to an exported page."""
+        if match[1] not in ID_TO_TITLE:
+            return match[0]
+        return f'href="{base_path}{match[1]}/"'
+
+    return link.sub(replace, content)
+
+
+def wrap_page(fragment: str, title: str, base_path: str) -> str:
+    """Wraps the rendered `fragment` of a page into a standalone HTML document.
+    The <head> that is embedded in the fragment is moved into the head of the document."""
+    head_match = _HEAD.search(fragment)
+    head_content = head_match[1] if head_match else ""
+    if head_match:
+        fragment = fragment[: head_match.start()] + fragment[head_match.end() :]
+
+    return html(lang="de")(
+        h("head")(
+            h("meta", charset="utf-8"),
+            h("meta", name="viewport", content="width=device-width, initial-scale=1"),
+            h("title")(title),
+            raw(head_content),
+        ),
+        h("body")(
+            h("main")(raw(_rewrite_links(fragment, base_path))),
+        ),
+    ).render()
+
+
+def make_index(pages: list[tuple[str, str]], base_path: str) -> str:
+    """Returns a document that links all `pages` (as `(pageId, title)`), sorted by title."""
+    return html(lang="de")(
+        h("head")(
+            h("meta", charset="utf-8"),
+            h("meta", name="viewport", content="width=device-width, initial-scale=1"),
+            h("title")("Index"),
+        ),
+        h("body")(
+            h("ul")(
+                h("li")(h("a", href=f"{base_path}{page_id}/")(title))
+                for page_id, title in sorted(pages, key=lambda p: p[1])
+            )
+        ),
+    ).render()
+
+
+def make_sitemap(page_ids: list[str], base_url: str) -> str:
+    """Returns the sitemap of all `page_ids`."""
+    urls = "".join(
+        f"<url><loc>{escape(base_url)}/{page_id}/</loc></url>" for page_id in sorted(page_ids)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{urls}</urlset>"
+    )
+
+
+def make_etag_map(exported: list[ExportedFile], base_path: str) -> str:
+    """Returns the entries of an nginx `map` from the URI of each file to its ETag.
+    The URIs start with the `base_path` the export is served under."""
+    return "".join(
+        f"{base_path}{e.path} '{e.etag}';\n" for e in sorted(exported, key=lambda e: e.path)
+    )
+
+
+def _write_if_changed(file: Path, content: bytes) -> None:
+    """Writes the `content` to the `file` unless the file already has exactly this content."""
+    if file.exists() and file.read_bytes() == content:
+        return
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_bytes(content)
+
+
+def _compress_brotli(content: bytes) -> bytes | None:
+    """Returns the Brotli-compressed `content` or `None` if Brotli is not installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+def write_file(folder: Path, path: str, content: str) -> ExportedFile:
+    """Writes the `content` to the `path` in the `folder` together with its precompressed siblings."""
+    data = content.encode("utf-8")
+    file = folder / path
+    _write_if_changed(file, data)
+    # A fixed `mtime` keeps the compressed output reproducible.
+    _write_if_changed(file.with_name(file.name + ".gz"), gzip.compress(data, 9, mtime=0))
+    compressed = _compress_brotli(data)
+    if compressed is not None:
+        _write_if_changed(file.with_name(file.name + ".br"), compressed)
+    return ExportedFile(path=path, etag=get_etag(data))
+
+
+def _export_page(folder: Path, page_id: str, title: str, base_path: str) -> ExportedFile:
+    """Exports the rendered page with the `page_id`."""
+    fragment = open(
+        Folders.rendered / get_page_file_name(page_id), encoding="utf-8"
+    ).read()
+    return write_file(folder, f"{page_id}/index.html", wrap_page(fragment, title, base_path))
+
+
+def export_site(
+    base_url: str,
+    *,
+    folder: Path = Folders.export,
+    jobs: int | None = None,
+) -> list[ExportedFile]:
+    """Exports all rendered pages as a static website.
+    Run this after rendering the pages.
+    Exported pages whose page def was removed are removed from the export.
+
+    :param base_url:
+        The URL under which the export will be served, used for the links and the sitemap.
+    :param folder:
+        The folder to export to.
+    :param jobs:
+        The amount of pages exported in parallel. Defaults to a value based on the amount of CPUs.
+    """
+    base_url = base_url.rstrip("/")
+    # Links are absolute paths, so the export works under any host.
+    base_path = re.sub(r"^[a-z]+://[^/]+", "", base_url) + "/"
+    pages = list(ID_TO_TITLE.items())
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        exported = list(
+            executor.map(
+                lambda page: _export_page(folder, page[0], page[1], base_path), pages
+            )
+        )
+
+    exported.append(write_file(folder, "index.html", make_index(pages, base_path)))
+    exported.append(write_file(folder, "sitemap.xml", make_sitemap(list(ID_TO_TITLE), base_url)))
+
+    _write_if_changed(folder / "etags.conf", make_etag_map(exported, base_path).encode("utf-8"))
+
+    # Otherwise, the mirror would keep serving removed pages.
+    for page_folder in folder.iterdir():
+        is_page = page_folder.is_dir() and page_folder.name.isdigit()
+        if is_page and page_folder.name not in ID_TO_TITLE:
+            shutil.rmtree(page_folder)
+    return exported
@@ -0,0 +1,175 @@
+"""Pruning of the embedded stylesheet to the rules a page actually uses.
+
+The stylesheet is parsed once per version (identified by its content hash) into rules with their required
+tags, classes and IDs. Each page is then analyzed for the tags, classes and IDs it contains,
+and only the rules that can match anything on the page are kept.
+
+The matching is conservative: A rule is kept if *any* of its selectors only requires tags, classes and IDs that
+occur on the page, regardless of their actual nesting. Pseudo-classes and attribute selectors are ignored.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_SELECTOR_NOISE = re.compile(r"::?[\w-]+(\([^)]*\))?|\[[^]]*]")
+_SELECTOR_TOKEN = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*)")
+
+ALWAYS_PRESENT_TAGS = {"html", "body"}
+"""Tags that are not part of the rendered content but always exist on the final page."""
+
+
+@dataclass(kw_only=True)
+class PageUsage:
+    """All tags, classes and IDs that occur on a page."""
+
+    tags: set[str] = field(default_factory=set)
+    classes: set[str] = field(default_factory=set)
+    ids: set[str] = field(default_factory=set)
+
+
+@dataclass(kw_only=True)
+class CssRule:
+    """A single rule of the stylesheet.
+
+    Rules in a block like `@media` are stored as `children` of the at-rule.
+    Other at-rules (`@font-face`, `@import`…) have neither `selectors` nor `children` and are always kept."""
+
+    prelude: str
+    body: str = ""
+    selectors: list[PageUsage] = field(default_factory=list)
+    children: list["CssRule"] | None = None
+
+
+class _UsageParser(HTMLParser):
+    """Collects the `PageUsage` of the fed HTML."""
+
+    def __init__(self):
+        super().__init__()
+        self.usage = PageUsage()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.usage.tags.add(tag)
+        for name, value in attrs:
+            if value is None:
+                continue
+            if name == "class":
+                self.usage.classes.update(value.split())
+            elif name == "id":
+                self.usage.ids.add(value)
+
+
+def get_page_usage(html: str) -> PageUsage:
+    """Returns all tags, classes and IDs used in the `html`."""
+    parser = _UsageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.usage
+
+
+def _parse_selector(selector: str) -> PageUsage:
+    """Returns the tags, classes and IDs the `selector` requires to match anything."""
+    required = PageUsage()
+    for prefix, name in _SELECTOR_TOKEN.findall(_SELECTOR_NOISE.sub(" ", selector)):
+        if prefix == ".":
+            required.classes.add(name)
+        elif prefix == "#":
+            required.ids.add(name)
+        else:
+            required.tags.add(name.lower())
+    return required
+
+
+def _find_block_end(css: str, start: int) -> int:
+    """Returns the index of the `}` that closes the block opened at `start`."""
+    depth = 0
+    for i in range(start, len(css)):
+        if css[i] == "{":
+            depth += 1
+        elif css[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("Unbalanced braces in stylesheet.")
+
+
+def _parse_rules(css: str) -> list[CssRule]:
+    """Parses the `css` (without comments) into its top-level rules."""
+    rules = list()
+    i = 0
+    while i < len(css):
+        brace = css.find("{", i)
+        semicolon = css.find(";", i)
+        if brace == -1 and semicolon == -1:
+            break
+
+        # Statement at-rules like `@import url(…);` have no block.
+        if semicolon != -1 and (brace == -1 or semicolon < brace):
+            rules.append(CssRule(prelude=css[i : semicolon + 1].strip()))
+            i = semicolon + 1
+            continue
+
+        end = _find_block_end(css, brace)
+        prelude = css[i:brace].strip()
+        body = css[brace + 1 : end]
+        if prelude.startswith("@media") or prelude.startswith("@supports"):
+            rules.append(CssRule(prelude=prelude, children=_parse_rules(body)))
+        elif prelude.startswith("@"):
+            rules.append(CssRule(prelude=prelude, body=body))
+        else:
+            rules.append(
+                CssRule(
+                    prelude=prelude,
+                    body=body,
+                    selectors=[_parse_selector(s) for s in prelude.split(",")],
+                )
+            )
+        i = end + 1
+    return rules
+
+
+_RULE_CACHE: dict[str, list[CssRule]] = dict()
+"""The parsed rules of each stylesheet version, keyed by the hash of the stylesheet."""
+
+
+def get_rules(css: str) -> list[CssRule]:
+    """Returns the parsed rules of the stylesheet `css`.
+    Each stylesheet version is only parsed once."""
+    key = hashlib.sha256(css.encode("utf-8")).hexdigest()
+    if key not in _RULE_CACHE:
+        _RULE_CACHE[key] = _parse_rules(_CSS_COMMENT.sub("", css))
+    return _RULE_CACHE[key]
+
+
+def _is_used(required: PageUsage, usage: PageUsage) -> bool:
+    """Whether everything `required` by a selector is present in the `usage`."""
+    return (
+        required.tags <= usage.tags | ALWAYS_PRESENT_TAGS
+        and required.classes <= usage.classes
+        and required.ids <= usage.ids
+    )
+
+
+def _render_rules(rules: list[CssRule], usage: PageUsage) -> list[str]:
+    """Renders all `rules` that may apply to the `usage` back into CSS."""
+    rendered = list()
+    for rule in rules:
+        if rule.children is not None:
+            children = _render_rules(rule.children, usage)
+            if children:
+                rendered.append(f"{rule.prelude} {{\n{''.join(children)}}}\n")
+        elif not rule.selectors:
+            if rule.body:
+                rendered.append(f"{rule.prelude} {{{rule.body}}}\n")
+            else:
+                rendered.append(rule.prelude + "\n")
+        elif any(_is_used(s, usage) for s in rule.selectors):
+            rendered.append(f"{rule.prelude} {{{rule.body}}}\n")
+    return rendered
+
+
+def prune_css(css: str, usage: PageUsage) -> str:
+    """Returns only the rules of the stylesheet `css` that may apply to a page with the `usage`."""
+    return "".join(_render_rules(get_rules(css), usage))
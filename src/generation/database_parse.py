@@ -1,15 +1,26 @@
 """Models and functions to help parse the content of the database."""
+import hashlib
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 from xml.etree import ElementTree as ETree
 
 from tinyhtml import raw
 
+from src.util.metrics import METRICS
 from src.util.tinyhtml_extended import H, h
 from util.path import get_page_files, Folders
 
 
-@dataclass(kw_only=True)
+def _text_if_exist(element: ETree.Element | None) -> str | None:
+    """Returns the `text` of the `element` if the element exists."""
+    if element is None:
+        return None
+    else:
+        return element.text
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
 class Contact:
     """All data that defines a contact.
     All contact methods (mobile/phone/mail) are optional."""
@@ -19,8 +30,27 @@ class Contact:
     phone: str | None
     mail: str | None
 
+    @classmethod
+    def from_element(cls, element: ETree.Element) -> "Contact":
+        """Creates the contact from a <contact> of the `contacts.xml`.
+
+        :raises ValueError:
+            When the `key` or `name` is missing."""
+        key = _text_if_exist(element.find("key"))
+        name = _text_if_exist(element.find("name"))
+        if name is None or key is None:
+            raise ValueError(f'Loosely defined contact. Name: "{name}". Key: "{key}".')
 
-@dataclass(kw_only=True)
+        return cls(
+            name=name,
+            key=key,
+            mobile=_text_if_exist(element.find("mobile")),
+            phone=_text_if_exist(element.find("phone")),
+            mail=_text_if_exist(element.find("mail")),
+        )
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
 class Location:
     """All data that defines a location."""
     name: str
@@ -28,68 +58,72 @@ class Location:
     address: str
     map_link: str
 
+    @classmethod
+    def from_element(cls, element: ETree.Element) -> "Location":
+        """Creates the location from a <location> of the `locations.xml`.
 
+        :raises ValueError:
+            When any of the data is missing."""
+        key = _text_if_exist(element.find("key"))
+        name = _text_if_exist(element.find("name"))
+        address = _text_if_exist(element.find("address"))
+        map_link = _text_if_exist(element.find("mapLink"))
+        if name is None or key is None or address is None or map_link is None:
+            raise ValueError(
+                f'Loosely defined location. Name: "{name}". Key: "{key}". '
+                f'Address: "{address}". Map link: "{map_link}".'
+            )
+
+        return cls(name=name, key=key, address=address, map_link=map_link)
+
+
+def _iter_elements(file: str | Path, tag: str) -> Iterator[ETree.Element]:
+    """Streams all elements with the `tag` from the XML `file`.
+    Each element is cleared after it was processed, so the file is never held in memory as a whole."""
+    for _, element in ETree.iterparse(file, events=("end",)):
+        if element.tag == tag:
+            yield element
+            element.clear()
+
+
+def _get_file_version(file: str | Path) -> str:
+    """Returns a hash of the content of the `file` to identify its version."""
+    with open(file, "rb") as stream:
+        return hashlib.sha256(stream.read()).hexdigest()
 
-def _text_if_exist(element: ETree.Element | None) -> str | None:
-    """Returns the `text` of the `element` if the element exists."""
-    if element is None:
-        return None
-    else:
-        return element.text
 
+DATA_VERSIONS: dict[str, str] = dict()
+"""The version of each database file that was parsed, keyed by the name of the data (e.g. "contacts")."""
 
 
 def _parse_contacts() -> dict[str, Contact]:
     """Parses the `contacts.xml` from the database.
     The contacts are returned as `key:Contact`-mapping."""
-    contacts = dict()
-
     file = r"database/contacts.xml"
-    root = ETree.parse(file).getroot()
-    contacts_elem = root.findall("contact")
-    for ce in contacts_elem:
-        key = _text_if_exist(ce.find("key"))
-        name = _text_if_exist(ce.find("name"))
-        if name is None or key is None:
-            raise ValueError(f'Loosely defined contact. Name: "{name}". Key: "{key}".')
-
-        contact = Contact(
-            name=name,
-            key=key,
-            mobile=_text_if_exist(ce.find("mobile")),
-            phone=_text_if_exist(ce.find("phone")),
-            mail=_text_if_exist(ce.find("mail")),
-        )
-
-        contacts[key] = contact
+    version = _get_file_version(file)
 
+    contacts = dict()
+    for element in _iter_elements(file, "contact"):
+        contact = Contact.from_element(element)
+        contacts[contact.key] = contact
+    # Only set after parsing, so a failed parse never pairs the new version with the old data.
+    DATA_VERSIONS["contacts"] = version
     return contacts
 
 CONTACTS: dict[str, Contact] = _parse_contacts()
 
 def _parse_locations() -> dict[str, Location]:
-    """Parses the `contacts.xml` from the database.
-    The contacts are returned as `key:Location`-mapping."""
-
-    locations = dict()
-
+    """Parses the `locations.xml` from the database.
+    The locations are returned as `key:Location`-mapping."""
     file = r"database/locations.xml"
-    root = ETree.parse(file).getroot()
-    contacts_elem = root.findall("location")
-    for ce in contacts_elem:
-        key = _text_if_exist(ce.find("key"))
-        name = _text_if_exist(ce.find("name"))
-        if name is None or key is None:
-            raise ValueError(f'Loosely defined location. Name: "{name}". Key: "{key}".')
+    version = _get_file_version(file)
 
-        location = Location(
-            name=name,
-            key=key,
-            address=_text_if_exist(ce.find("address")),
-            map_link=_text_if_exist(ce.find("mapLink")),
-        )
-
-        locations[key] = location
+    locations = dict()
+    for element in _iter_elements(file, "location"):
+        location = Location.from_element(element)
+        locations[location.key] = location
+    # Only set after parsing, so a failed parse never pairs the new version with the old data.
+    DATA_VERSIONS["locations"] = version
     return locations
 
 LOCATIONS: dict[str, Location] = _parse_locations()
@@ -101,10 +135,14 @@ def get_head() -> raw:
     return raw(open(Folders.res / "head.html").read())
 
 
+def get_stylesheet() -> str:
+    """Gets the content of the stylesheet for the document."""
+    return open(Folders.res / "style.css").read()
+
+
 def get_style() -> H:
     """Gets the required <style> for the document."""
-    style = open(Folders.res / "style.css").read()
-    return h("style")(style)
+    return h("style")(get_stylesheet())
 
 
 
@@ -121,6 +159,7 @@ def _get_id_to_title() -> dict[str, str]:
 
 def get_title_and_id(file: Path) -> tuple[str, str]:
     """Returns the page title and page ID as defined in the page data in the `file`."""
+    METRICS.count("page_def_parses")
     root = ETree.parse(file).getroot()
     page_title = root.find("meta/pageTitle")
     page_id = root.find("meta/pageId")
@@ -133,3 +172,16 @@ def get_title_and_id(file: Path) -> tuple[str, str]:
 
 ID_TO_TITLE: dict[str, str] = _get_id_to_title()
 """All defined page IDs as mapping to their title."""
+
+
+def reload_database() -> None:
+    """Parses all database files and the page index again.
+    The mappings are updated in place, so modules that imported them directly also see the new data."""
+    for mapping, parse in [
+        (CONTACTS, _parse_contacts),
+        (LOCATIONS, _parse_locations),
+        (ID_TO_TITLE, _get_id_to_title),
+    ]:
+        data = parse()
+        mapping.clear()
+        mapping.update(data)
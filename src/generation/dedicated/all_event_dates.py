@@ -1,41 +1,22 @@
 """Generation of the tables used to display all event dates."""
 
+import csv
 import datetime
 import xml.etree.ElementTree as ETree
 from collections import defaultdict
 from dataclasses import dataclass
 
-import pandas as pd
 from tinyhtml import SupportsRender, frag
 
 import src.elements.templates as tmpl
 from elements.templates import get_link
-from generation.database_parse import LOCATIONS
 from src.elements.templates import header
-from src.generation.database_parse import ID_TO_TITLE
+from src.generation.database_parse import ID_TO_TITLE, LOCATIONS
 from src.upload.upload import get_page_url
 from src.util.tinyhtml_extended import H, h
 from util.path import Folders
 
 
-@dataclass(kw_only=True)
-class EventDate:
-    """All data that defines an event date in the table.
-
-    Must have either a `courseId` or `displayName` defined.
-    If both are defined, the `displayName` will overwrite the `courseId`.
-    """
-
-    day: str
-    startTime: datetime.time
-    endTime: datetime.time
-    courseId: str | None
-    extraInfo: str | None
-    displayName: str | None
-    isCooperation: str
-    location: str
-
-
 DAY_TRANSLATE = {
     "monday": "Montag",
     "tuesday": "Dienstag",
@@ -46,69 +27,166 @@ DAY_TRANSLATE = {
     "sunday": "Sonntag",
 }
 
-
-def read_data() -> pd.DataFrame:
-    """Reads the event data from the database."""
-    df = pd.read_csv(
-        Folders.database / "event_dates.csv",
-        sep=";",
-        dtype={
-            "day": str,
-            "startTime": str,
-            "endTime": str,
-            "courseId": str,
-            "extraInfo": str,
-            "displayName": str,
-            "cooperation": bool,
-            "location": str,
-        },
-    )
-    df = df.where(pd.notna(df), None)
-    return df
-
-
 TIME_FORMAT = "%H:%M"
 
+TRUE_VALUES = {"1", "true", "yes"}
+"""The values of boolean columns that are interpreted as `True`. Anything else is `False`."""
+
 
 def cast_time(time: str) -> datetime.time:
     """Casts the `time`-string into a `datetime.time`."""
     return datetime.datetime.strptime(time, TIME_FORMAT).time()
 
 
+def _value_if_exist(value: str | None) -> str | None:
+    """Returns the `value` of a CSV cell or `None` if the cell is empty."""
+    if value is None or value.strip() == "":
+        return None
+    return value
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class EventDate:
+    """All data that defines an event date in the table.
+
+    Must have either a `course_id` or `display_name` defined.
+    If both are defined, the `display_name` will overwrite the `course_id`.
+    """
+
+    day: str
+    start_time: datetime.time
+    end_time: datetime.time
+    course_id: str | None
+    extra_info: str | None
+    display_name: str | None
+    is_cooperation: bool
+    location: str
+
+    @classmethod
+    def from_row(cls, row: dict[str, str | None]) -> "EventDate":
+        """Creates the event date from a row of the `event_dates.csv`.
+
+        :raises ValueError:
+            When the row is missing required data or contains invalid values."""
+        day = _value_if_exist(row.get("day"))
+        location = _value_if_exist(row.get("location"))
+        course_id = _value_if_exist(row.get("courseId"))
+        display_name = _value_if_exist(row.get("displayName"))
+        if day not in DAY_TRANSLATE:
+            raise ValueError(f'Invalid day: "{day}".')
+        if location is None:
+            raise ValueError(f"Event date without location: {row}.")
+        if course_id is None and display_name is None:
+            raise ValueError(f"Event date without course ID or display name: {row}.")
+
+        return cls(
+            day=day,
+            start_time=cast_time(row["startTime"]),
+            end_time=cast_time(row["endTime"]),
+            course_id=course_id,
+            extra_info=_value_if_exist(row.get("extraInfo")),
+            display_name=display_name,
+            is_cooperation=(row.get("isCooperation") or "").strip().lower()
+            in TRUE_VALUES,
+            location=location,
+        )
+
+
+def read_event_dates() -> list[EventDate]:
+    """Reads all event dates from the database in the order they are defined.
+    The file is streamed row by row."""
+    with open(
+        Folders.database / "event_dates.csv", encoding="utf-8", newline=""
+    ) as stream:
+        return [EventDate.from_row(row) for row in csv.DictReader(stream, delimiter=";")]
+
+
 def format_time(time: datetime.time) -> str:
     """Formats the `time` as `str`."""
     return time.strftime(TIME_FORMAT)
 
 
 def by_start_time(event_date: EventDate) -> datetime.time:
-    """Returns the `startTime` of the `ed`."""
-    return event_date.startTime
+    """Returns the `start_time` of the `event_date`."""
+    return event_date.start_time
 
 
-def get_event_dates(df: pd.DataFrame) -> dict[str, dict[str, list[EventDate]]]:
-    """Reads all event dates from the database.
-    The dates will be sorted by their start time.
+def group_event_dates(
+    event_dates: list[EventDate],
+) -> dict[str, dict[str, list[EventDate]]]:
+    """Groups the `event_dates` first by location and then by day.
+    The groups are ordered by their first occurrence, the dates in each group by their start time.
 
     :returns:
-        The event days grouped first by location and then by day.
         `dict[<location>, dict[<day>, list[EventDate]]]`"""
-    event_dates = defaultdict(lambda: defaultdict(list))
-    for _, row in df.iterrows():
-        data = row.to_dict()
-        data["startTime"] = cast_time(data["startTime"])
-        data["endTime"] = cast_time(data["endTime"])
-
-        ed = EventDate(**data)
-        event_dates[ed.location][ed.day].append(ed)
+    grouped = defaultdict(lambda: defaultdict(list))
+    for ed in event_dates:
+        grouped[ed.location][ed.day].append(ed)
     for day_data in [
         day_data
-        for location_data in event_dates.values()
+        for location_data in grouped.values()
         for day_data in location_data.values()
     ]:
         day_data.sort(key=by_start_time)
 
     # Cast the `defaultdict` back into a `dict` before returning.
-    return {k: dict(v) for k, v in event_dates.items()}
+    return {k: dict(v) for k, v in grouped.items()}
+
+
+def get_event_dates() -> dict[str, dict[str, list[EventDate]]]:
+    """Reads all event dates from the database.
+    The dates will be sorted by their start time.
+
+    :returns:
+        The event days grouped first by location and then by day.
+        `dict[<location>, dict[<day>, list[EventDate]]]`"""
+    return group_event_dates(read_event_dates())
+
+
+class EventStore:
+    """All event dates of the database, indexed by course, location and day.
+    All queries only touch the matching event dates instead of the whole database."""
+
+    def __init__(self, event_dates: list[EventDate]):
+        self.event_dates = event_dates
+        self._by_course: dict[str, list[EventDate]] = defaultdict(list)
+        self._by_location: dict[str, list[EventDate]] = defaultdict(list)
+        self._by_day: dict[str, list[EventDate]] = defaultdict(list)
+        for ed in event_dates:
+            if ed.course_id is not None:
+                self._by_course[ed.course_id].append(ed)
+            self._by_location[ed.location].append(ed)
+            self._by_day[ed.day].append(ed)
+
+    def for_course(self, course_id: str) -> list[EventDate]:
+        """Returns all event dates of the course with the `course_id`."""
+        return self._by_course.get(course_id, [])
+
+    def for_location(self, location: str) -> list[EventDate]:
+        """Returns all event dates at the `location`."""
+        return self._by_location.get(location, [])
+
+    def for_day(self, day: str) -> list[EventDate]:
+        """Returns all event dates on the `day`."""
+        return self._by_day.get(day, [])
+
+
+_EVENT_STORE: tuple[tuple[int, int], EventStore] | None = None
+"""The current event store with the version of the database it was built from."""
+
+
+def get_event_store() -> EventStore:
+    """Returns the event store of the database.
+    The store is only rebuilt when the database changed."""
+    global _EVENT_STORE
+
+    file = Folders.database / "event_dates.csv"
+    # The modification time and size identify the version without reading the file on every call.
+    stat = file.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    if _EVENT_STORE is None or _EVENT_STORE[0] != version:
+        _EVENT_STORE = (version, EventStore(read_event_dates()))
+    return _EVENT_STORE[1]
 
 
 def get_link_from_id(page_id) -> H:
@@ -122,24 +200,24 @@ def generate_table(event_dates: list[EventDate]) -> H:
     rows: list[SupportsRender] = list()
     for ed in event_dates:
         time = h("div")(
-            format_time(ed.startTime),
+            format_time(ed.start_time),
             h("br"),
-            "–" + format_time(ed.endTime),
+            "–" + format_time(ed.end_time),
         )
 
         # Get the name.
         # Take the display name or generate it from the ID.
-        if ed.displayName is not None:
-            name = ed.displayName
+        if ed.display_name is not None:
+            name = ed.display_name
         else:
-            name = get_link_from_id(ed.courseId)
+            name = get_link_from_id(ed.course_id)
 
         # Concatenate additional info for the text.
         sub_texts = list()
-        if ed.isCooperation:
+        if ed.is_cooperation:
             sub_texts.append("(Kooperation, geschlossene Gruppe)")
-        if ed.extraInfo is not None:
-            sub_texts.append(ed.extraInfo)
+        if ed.extra_info is not None:
+            sub_texts.append(ed.extra_info)
 
         text = h("div")(name, *[(h("br"), st) for st in sub_texts])
 
@@ -184,6 +262,5 @@ def generate_tables_for_locations(
 
 def generate_date_tables_from_database(_: ETree.Element) -> H:
     """Generates the training date tables from the data in `database/event_dates.csv`."""
-    data = read_data()
-    event_data = get_event_dates(data)
+    event_data = group_event_dates(get_event_store().event_dates)
     return generate_tables_for_locations(event_data)
@@ -3,6 +3,7 @@ import xml.etree.ElementTree as ETree
 from pathlib import Path
 
 import elements.templates
+from src.util.metrics import METRICS
 from upload.upload import get_page_url
 from util.path import get_page_files
 from util.tinyhtml_extended import H, h
@@ -12,6 +13,7 @@ VALID_PAGE_TYPES = ["course", "aux", "overview"]
 
 def get_metadata(file: Path) -> tuple[str, str, str]:
     """Returns the page title, page ID and page type as defined in the page data in the `file`."""
+    METRICS.count("page_def_parses")
     root = ETree.parse(file).getroot()
 
     page_title = root.find("meta/pageTitle")
@@ -0,0 +1,74 @@
+"""Generation of the schedule of a single course from the event dates in the database."""
+
+import xml.etree.ElementTree as ETree
+
+import src.elements.constants as const
+import src.elements.templates as tmpl
+from src.generation.database_parse import LOCATIONS
+from src.generation.dedicated.all_event_dates import (
+    DAY_TRANSLATE,
+    EventDate,
+    format_time,
+    get_event_store,
+    group_event_dates,
+)
+from src.util.tinyhtml_extended import H, h
+
+
+def format_event_date(event_date: EventDate) -> str:
+    """Formats the `event_date` as single line, e.g. "Montag, 16:30–17:30"."""
+    text = (
+        f"{DAY_TRANSLATE[event_date.day]}, "
+        f"{format_time(event_date.start_time)}–{format_time(event_date.end_time)}"
+    )
+    if event_date.extra_info is not None:
+        text += f" ({event_date.extra_info})"
+    return text
+
+
+def generate_location_group(location: str, event_dates: list[EventDate]) -> H:
+    """Renders all `event_dates` at the `location` with the location info below them.
+    This matches the layout of an <eventGroup>."""
+    location_data = LOCATIONS[location]
+    return h("div")(
+        h("div", style={"margin-left": 16})(
+            h("ul", style={"margin-bottom": 4})(
+                h("li")(format_event_date(ed)) for ed in event_dates
+            ),
+            tmpl.event_location(
+                name=location_data.name,
+                address=location_data.address,
+                map_link=location_data.map_link,
+            ),
+        )
+    )
+
+
+def generate_course_schedule(element: ETree.Element) -> H:
+    """Generates the schedule of the course with the ID in the `element` from `database/event_dates.csv`.
+    The dates are grouped by location, multiple groups are separated by a horizontal line.
+    This matches the layout of <eventData>, so it can replace a manually maintained one."""
+    course_id = element.text.strip()
+    event_dates = get_event_store().for_course(course_id)
+    if len(event_dates) == 0:
+        raise ValueError(f'No event dates defined for the course "{course_id}".')
+
+    groups = list()
+    for location, days in group_event_dates(event_dates).items():
+        if groups:
+            groups.append(
+                tmpl.horizontal_line(
+                    margin_top=8, margin_bottom=8, margin_left=16, margin_right=16
+                )
+            )
+        groups.append(
+            generate_location_group(
+                location, [ed for day_dates in days.values() for ed in day_dates]
+            )
+        )
+
+    return h("div")(
+        const.EVENT_HEADER,
+        *groups,
+        const.PARA_SPACER,
+    )
@@ -0,0 +1,204 @@
+"""The registry of all parsers that render the XML elements of the page defs.
+
+Parsers can be registered in three ways:
+- Directly, with the `element_parser` decorator in `render_page_defs.py`.
+- Lazily, by the path of the parser as `"<module>:<function>"`.
+  The module is only imported when an element with the tag is rendered for the first time,
+  so data-heavy elements (e.g. `<allEventDates>`) do not slow down builds that do not use them.
+- By other packages, with an entry point in the group `website_builder.element_parsers`.
+  The name of the entry point is the tag, e.g. in the `pyproject.toml` of the package:
+
+      [project.entry-points."website_builder.element_parsers"]
+      myElement = "my_package.parsers:parse_my_element"
+
+  Entry points are loaded lazily as well. They cannot replace the parsers of this project.
+"""
+
+import importlib
+import threading
+import xml.etree.ElementTree as ETree
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from tinyhtml import SupportsRender
+
+ENTRY_POINT_GROUP = "website_builder.element_parsers"
+
+Parser = Callable[[ETree.Element], SupportsRender]
+
+
+@dataclass(kw_only=True)
+class _Registration:
+    """A parser that is either loaded or only known by its path."""
+
+    parser: Parser | None = None
+    path: str | None = None
+    """The `"<module>:<function>"` to import the parser from if it is not loaded yet."""
+    reads: tuple[str, ...] | None = None
+    """The data the parser itself reads, `None` if it is not known (See `element_parser()`)."""
+    memoize: bool = False
+    """Whether the rendered HTML of the parser is memoized (See `element_parser()`)."""
+    children: str | None = None
+    """The `findall()` path of the children the parser renders with `parse_element()`, if any."""
+
+
+def _load(path: str) -> Parser:
+    """Imports the parser from the `"<module>:<function>"` `path`."""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+class ElementRegistry:
+    """Maps the tag of each element to the parser that renders it.
+    Parsers that are registered by their path are imported on first use."""
+
+    def __init__(self):
+        self._registrations: dict[str, _Registration] = dict()
+        self._entry_points_loaded = False
+        # Importing a module may register further parsers, so the lock must be reentrant.
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        tag: str,
+        parser: Parser,
+        *,
+        reads: Iterable[str] | None = None,
+        memoize: bool = False,
+        children: str | None = None,
+    ) -> None:
+        """Registers the `parser` for the `tag`, replacing any previous parser."""
+        with self._lock:
+            self._registrations[tag] = _Registration(
+                parser=parser,
+                reads=tuple(reads) if reads is not None else None,
+                memoize=memoize,
+                children=children,
+            )
+
+    def register_lazy(
+        self,
+        tag: str,
+        path: str,
+        *,
+        reads: Iterable[str] | None = None,
+        memoize: bool = False,
+        children: str | None = None,
+    ) -> None:
+        """Registers the parser at the `"<module>:<function>"` `path` for the `tag` without importing it."""
+        with self._lock:
+            self._registrations[tag] = _Registration(
+                path=path,
+                reads=tuple(reads) if reads is not None else None,
+                memoize=memoize,
+                children=children,
+            )
+
+    def _load_entry_points(self) -> None:
+        """Registers the parsers of other packages, unless a parser for their tag is already registered."""
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            self._entry_points_loaded = True
+            # Imported lazily, as reading the metadata of all installed packages is slow.
+            from importlib.metadata import entry_points
+
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                if entry_point.name not in self._registrations:
+                    self.register_lazy(entry_point.name, entry_point.value)
+
+    def get(self, tag: str) -> Parser:
+        """Returns the parser for the `tag`, importing it if necessary.
+
+        :raises KeyError:
+            When no parser is registered for the `tag`."""
+        registration = self._registrations.get(tag)
+        if registration is None:
+            self._load_entry_points()
+            registration = self._registrations.get(tag)
+            if registration is None:
+                raise KeyError(f'No parser is registered for the element "{tag}".')
+
+        if registration.parser is None:
+            with self._lock:
+                if registration.parser is None:
+                    registration.parser = _load(registration.path)
+        return registration.parser
+
+    def get_children(self, tag: str) -> str | None:
+        """Returns the `findall()` path of the children the parser of the `tag` renders, if any.
+        This neither imports the parser nor loads entry points."""
+        registration = self._registrations.get(tag)
+        return registration.children if registration is not None else None
+
+    def get_reads(self, element: ETree.Element) -> tuple[str, ...] | None:
+        """Returns the data the parsers of the `element` and of all nested elements they render read.
+        Returns `None` if any of these parsers reads data that is not known (e.g. images, the event dates
+        or the parsers of other packages). This neither imports any parser nor loads entry points."""
+        reads = set()
+        pending = [element]
+        while pending:
+            current = pending.pop()
+            registration = self._registrations.get(current.tag)
+            if registration is None or registration.reads is None:
+                return None
+            reads.update(registration.reads)
+            if registration.children is not None:
+                pending.extend(current.findall(registration.children))
+        return tuple(sorted(reads))
+
+    def get_memoized_reads(self, element: ETree.Element) -> tuple[str, ...] | None:
+        """Returns the data the `element` reads (See `get_reads()`) if its HTML can be memoized, otherwise `None`."""
+        registration = self._registrations.get(element.tag)
+        if registration is None or not registration.memoize:
+            return None
+        return self.get_reads(element)
+
+    def preload(self, tags: Iterable[str]) -> None:
+        """Imports the parsers of all `tags`, e.g. before rendering in multiple threads.
+        Entry points are only loaded if any of the `tags` is not registered otherwise.
+
+        :raises KeyError:
+            When no parser is registered for any of the `tags`."""
+        for tag in tags:
+            self.get(tag)
+
+    def get_loaded_tags(self) -> set[str]:
+        """Returns the tags whose parsers are imported."""
+        return {t for t, r in self._registrations.items() if r.parser is not None}
+
+
+ELEMENT_PARSERS = ElementRegistry()
+"""The registry used by `parse_element()`."""
+
+ELEMENT_PARSERS.register_lazy(
+    "allEventDates",
+    "src.generation.dedicated.all_event_dates:generate_date_tables_from_database",
+)
+ELEMENT_PARSERS.register_lazy(
+    "allCourses",
+    "src.generation.dedicated.all_pages:generate_course_list_from_database",
+)
+ELEMENT_PARSERS.register_lazy(
+    "allAux",
+    "src.generation.dedicated.all_pages:generate_aux_list_from_database",
+)
+ELEMENT_PARSERS.register_lazy(
+    "courseSchedule",
+    "src.generation.dedicated.course_schedule:generate_course_schedule",
+)
+
+
+def get_required_tags(elements: Iterable[ETree.Element]) -> set[str]:
+    """Returns the tags of the `elements` and of all nested elements their parsers render
+    (e.g. the `<contact>`s in a `<contactData>`), i.e. all tags that need a parser to render the `elements`.
+    This neither imports any parser nor loads entry points."""
+    tags = set()
+    pending = list(elements)
+    while pending:
+        element = pending.pop()
+        tags.add(element.tag)
+        children = ELEMENT_PARSERS.get_children(element.tag)
+        if children is not None:
+            pending.extend(element.findall(children))
+    return tags
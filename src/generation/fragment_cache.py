@@ -0,0 +1,92 @@
+"""Memoization of rendered element subtrees.
+
+Many pages contain identical blocks (e.g. the same `<contactData>`), which only need to be rendered once.
+The rendered HTML is cached by a canonical hash of the element subtree and the versions of the data its parsers read,
+so a change to e.g. the `contacts.xml` never returns stale HTML.
+"""
+
+import hashlib
+import threading
+import xml.etree.ElementTree as ETree
+from collections import OrderedDict
+from typing import Iterable
+
+from src.generation.database_parse import DATA_VERSIONS
+
+
+def _canonical(element: ETree.Element) -> tuple:
+    """Returns everything that affects the rendering of the `element` as nested tuples.
+    The `tail` of the `element` itself is not part of it, as it belongs to the parent."""
+    return (
+        element.tag,
+        tuple(sorted(element.attrib.items())),
+        element.text,
+        tuple((_canonical(child), child.tail) for child in element),
+    )
+
+
+def get_element_key(element: ETree.Element, reads: Iterable[str]) -> str:
+    """Returns the cache key for the `element`, whose parsers read the data in `DATA_VERSIONS` listed in `reads`."""
+    versions = tuple((r, DATA_VERSIONS.get(r)) for r in sorted(reads))
+    return hashlib.sha256(repr((_canonical(element), versions)).encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """A bounded mapping of cache keys to rendered HTML that evicts the least recently used entries.
+    The cache can safely be shared by multiple threads.
+
+    :param maxsize:
+        The maximum amount of cached fragments. A size of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._fragments: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached HTML for the `key` or `None` if it is not cached."""
+        with self._lock:
+            html = self._fragments.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: str, html: str) -> None:
+        """Caches the `html` under the `key`, evicting the least recently used entry if the cache is full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._fragments[key] = html
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.maxsize:
+                self._fragments.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all cached fragments and resets the statistics."""
+        with self._lock:
+            self._fragments.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Resets the hit and miss counters, e.g. at the start of a build."""
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups that were answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+
+FRAGMENT_CACHE = FragmentCache(maxsize=1024)
+"""The cache used by `parse_element()`."""
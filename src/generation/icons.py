@@ -0,0 +1,136 @@
+"""Replacing the Material Icons webfont with inline SVGs.
+
+The templates render icons as ligature text (`<span class="material-icons">face</span>`),
+which requires the whole icon font to be downloaded by every visitor.
+This stage replaces these spans with references to an SVG sprite that is embedded once per page
+and only contains the icons used on that page.
+The SVGs are taken from the locally vendored icons in `./res/icons/<class>/<name>.svg`
+(See `./scripts/vendor_icons.py`).
+
+Icons that are not vendored are left as they are, in which case the font is kept for that page.
+"""
+
+import functools
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from util.path import Folders
+
+ICON_CLASSES = ("material-icons", "material-icons-outlined")
+"""The classes of the Material Icons font that are used by the templates."""
+
+_ICON_SPAN = re.compile(
+    r'<span class="(material-icons(?:-outlined)?)"(?: style="([^"]*)")?>([a-z0-9_]+)</span>'
+)
+_FONT_LINK = re.compile(r"<link[^>]*fonts\.googleapis\.com/icon[^>]*>\s*")
+_SVG = re.compile(r'<svg[^>]*viewBox="([^"]*)"[^>]*>(.*)</svg>', re.DOTALL)
+
+
+@dataclass(kw_only=True)
+class IconResult:
+    """The HTML with the inlined icons and the icons that were (not) inlined as `(class, name)`."""
+
+    html: str
+    inlined: set[tuple[str, str]] = field(default_factory=set)
+    missing: set[tuple[str, str]] = field(default_factory=set)
+
+
+@dataclass(kw_only=True)
+class VendoredIcon:
+    """The content of a vendored SVG icon."""
+
+    view_box: str
+    content: str
+
+
+def get_icon_file(klass: str, name: str) -> Path:
+    """Returns the file of the vendored icon `name` in the style of the `klass`."""
+    return Folders.icons / klass / f"{name}.svg"
+
+
+@functools.cache
+def load_icon(klass: str, name: str) -> VendoredIcon | None:
+    """Returns the vendored icon or `None` if the icon is not vendored."""
+    file = get_icon_file(klass, name)
+    if not file.exists():
+        return None
+
+    match = _SVG.search(open(file, encoding="utf-8").read())
+    if match is None:
+        raise ValueError(f'Malformed icon file: "{file}".')
+    return VendoredIcon(view_box=match[1], content=match[2].strip())
+
+
+def get_used_icons(html: str) -> set[tuple[str, str]]:
+    """Returns all icons that are rendered as ligature text in the `html` as `(class, name)`."""
+    return {(m[1], m[3]) for m in _ICON_SPAN.finditer(html)}
+
+
+def get_symbol_id(klass: str, name: str) -> str:
+    """Returns the ID of the icon in the sprite."""
+    return f"{klass}-{name}".replace("_", "-")
+
+
+def _make_sprite(icons: set[tuple[str, str]]) -> str:
+    """Returns a hidden <svg> that defines a <symbol> for each of the `icons`."""
+    symbols = list()
+    for klass, name in sorted(icons):
+        icon = load_icon(klass, name)
+        symbols.append(
+            f'<symbol id="{get_symbol_id(klass, name)}" viewBox="{icon.view_box}">'
+            f"{icon.content}</symbol>"
+        )
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" style="display: none;">'
+        + "".join(symbols)
+        + "</svg>"
+    )
+
+
+def _make_reference(klass: str, name: str, style: str | None) -> str:
+    """Returns an <svg> that shows the icon from the sprite.
+    The icon is sized by the `font-size` in the `style`, just like the ligature text."""
+    style_attr = f' style="{style}"' if style else ""
+    return (
+        f'<svg class="icon" width="1em" height="1em" fill="currentColor" aria-hidden="true"{style_attr}>'
+        f'<use href="#{get_symbol_id(klass, name)}"/></svg>'
+    )
+
+
+def _get_content_start(html: str) -> int:
+    """Returns the index after the embedded <style> (or <head>) of the page."""
+    for closing in ("</style>", "</head>"):
+        index = html.find(closing)
+        if index != -1:
+            return index + len(closing)
+    return 0
+
+
+def inline_icons(html: str) -> IconResult:
+    """Replaces all icons in the rendered `html` that are vendored with inline SVGs.
+    If no icon needs the font anymore, the font is removed from the head."""
+    result = IconResult(html=html)
+    for klass, name in get_used_icons(html):
+        if load_icon(klass, name) is None:
+            result.missing.add((klass, name))
+        else:
+            result.inlined.add((klass, name))
+
+    def replace(match: re.Match) -> str:
+        """Replace the span with a reference if the icon is vendored."""
+        if (match[1], match[3]) not in result.inlined:
+            return match[0]
+        return _make_reference(match[1], match[3], match[2])
+
+    html = _ICON_SPAN.sub(replace, html)
+    if not result.missing:
+        html = _FONT_LINK.sub("", html)
+    if result.inlined:
+        # Place the sprite directly after the <head> and <style> but before any content.
+        content_start = _get_content_start(html)
+        html = html[:content_start] + _make_sprite(result.inlined) + html[content_start:]
+
+    result.html = html
+    return result
+
@@ -0,0 +1,207 @@
+"""Processing of local images into responsive variants.
+
+Images that are stored in `./database/images` can be referenced by their file name in the `<centerImage>` and
+`<sideImage>` tags. They are converted into multiple widths and formats, which are stored in
+`./database/images_derived` and must be served under the `IMAGE_BASE_URL`.
+
+The derived images are named after the hash of their source, so they are only generated once per source version.
+The size of each source version is stored next to its variants, so the source is only decoded when a variant is missing.
+
+This requires `Pillow`, which is only imported when a local image is actually used.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from util.path import Folders
+
+load_dotenv()
+
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL")
+"""The URL under which the contents of `./database/images_derived` are served."""
+
+IMAGE_WIDTHS = (480, 800, 1200, 1600)
+"""The widths (in pixels) the images are scaled to. Widths larger than the source are skipped."""
+
+IMAGE_QUALITY = 80
+"""The encoder quality of the lossy formats."""
+
+IMAGE_SIZES = {
+    True: "(max-width: 800px) 80vw, 640px",
+    False: "(max-width: 800px) 35vw, 280px",
+}
+"""The displayed width of centered (`True`) and side images (`False`), matching their CSS width."""
+
+
+@dataclass(kw_only=True)
+class ImageFormat:
+    """A format the images are converted to."""
+
+    extension: str
+    mimetype: str
+    pil_format: str
+
+
+AVIF = ImageFormat(extension="avif", mimetype="image/avif", pil_format="AVIF")
+WEBP = ImageFormat(extension="webp", mimetype="image/webp", pil_format="WEBP")
+JPEG = ImageFormat(extension="jpg", mimetype="image/jpeg", pil_format="JPEG")
+PNG = ImageFormat(extension="png", mimetype="image/png", pil_format="PNG")
+
+
+@dataclass(kw_only=True)
+class ProcessedImage:
+    """All variants of a processed image.
+
+    The `sources` are the efficient formats as `mimetype:srcset`-mapping, in order of preference.
+    The `srcset` is the fallback format, which is supported by all browsers."""
+
+    width: int
+    height: int
+    src: str
+    srcset: str
+    link: str
+    sources: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(kw_only=True, frozen=True)
+class SourceInfo:
+    """The properties of a source image that determine its variants."""
+
+    width: int
+    height: int
+    has_alpha: bool
+
+    @classmethod
+    def from_image(cls, image) -> "SourceInfo":
+        """Returns the properties of the decoded `image`."""
+        return cls(
+            width=image.width,
+            height=image.height,
+            has_alpha=image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info,
+        )
+
+    @classmethod
+    def load(cls, file: Path) -> "SourceInfo | None":
+        """Returns the properties stored in the `file` or `None` if there are none (readable)."""
+        try:
+            with open(file, encoding="utf-8") as stream:
+                return cls(**json.load(stream))
+        except (OSError, json.JSONDecodeError, TypeError):
+            return None
+
+    def save(self, file: Path) -> None:
+        """Stores the properties in the `file`."""
+        temp_file = file.with_suffix(file.suffix + ".tmp")
+        with open(temp_file, "w", encoding="utf-8") as stream:
+            json.dump(asdict(self), stream)
+        temp_file.replace(file)
+
+
+def is_local_image(source: str) -> bool:
+    """Whether the `source` of an image tag refers to an image in `./database/images`."""
+    return "/" not in source and (Folders.images / source).is_file()
+
+
+_SOURCE_HASHES: dict[Path, tuple[tuple[int, int], str]] = dict()
+"""The hash of each source with the version of the file it was computed from."""
+
+
+def get_source_hash(file: Path) -> str:
+    """Returns a short hash of the content of the `file`.
+    The hash is only computed again when the modification time or size of the `file` changed."""
+    stat = file.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _SOURCE_HASHES.get(file)
+    if cached is None or cached[0] != version:
+        cached = (version, hashlib.sha256(file.read_bytes()).hexdigest()[:16])
+        _SOURCE_HASHES[file] = cached
+    return cached[1]
+
+
+def get_image_url(file_name: str) -> str:
+    """Returns the public URL of the derived image `file_name`."""
+    if IMAGE_BASE_URL is None:
+        raise ValueError("Local images require the `IMAGE_BASE_URL` to be defined.")
+    return IMAGE_BASE_URL.rstrip("/") + "/" + file_name
+
+
+def _get_efficient_formats() -> list[ImageFormat]:
+    """Returns the efficient formats the installed `Pillow` can encode, in order of preference."""
+    from PIL import features
+
+    return [f for f in (AVIF, WEBP) if features.check(f.extension)]
+
+
+def _open_image(file: Path):
+    """Returns the decoded image in the `file`."""
+    from PIL import Image, ImageOps
+
+    with Image.open(file) as opened:
+        # Apply the camera orientation, as the EXIF data is not kept in the variants.
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    return image
+
+
+def _save_variant(image, width: int, image_format: ImageFormat, file: Path) -> None:
+    """Scales the `image` to the `width` and saves it as `file`."""
+    from PIL import Image
+
+    height = round(image.height * width / image.width)
+    variant = image.resize((width, height), Image.Resampling.LANCZOS)
+    if image_format is JPEG:
+        variant = variant.convert("RGB")
+
+    # Write to a temporary file first so an interrupted build never leaves a broken variant in the cache.
+    temp_file = file.with_suffix(file.suffix + ".tmp")
+    variant.save(temp_file, format=image_format.pil_format, quality=IMAGE_QUALITY)
+    temp_file.replace(file)
+
+
+def process_image(source: str) -> ProcessedImage:
+    """Converts the local image `source` into all widths and formats.
+    Variants that already exist for this version of the source are reused.
+    The source is only decoded if its properties are not stored yet or any variant is missing."""
+    file = Folders.images / source
+    source_hash = get_source_hash(file)
+    Folders.images_derived.mkdir(parents=True, exist_ok=True)
+
+    info_file = Folders.images_derived / f"{file.stem}-{source_hash}.json"
+    info = SourceInfo.load(info_file)
+    image = None
+    if info is None:
+        image = _open_image(file)
+        info = SourceInfo.from_image(image)
+        info.save(info_file)
+
+    fallback = PNG if info.has_alpha else JPEG
+    widths = [w for w in IMAGE_WIDTHS if w < info.width] + [info.width]
+
+    srcsets: dict[str, list[str]] = dict()
+    for image_format in [*_get_efficient_formats(), fallback]:
+        entries = list()
+        for width in widths:
+            name = f"{file.stem}-{source_hash}-{width}.{image_format.extension}"
+            variant = Folders.images_derived / name
+            if not variant.exists():
+                if image is None:
+                    image = _open_image(file)
+                _save_variant(image, width, image_format, variant)
+            entries.append(f"{get_image_url(name)} {width}w")
+        srcsets[image_format.mimetype] = entries
+
+    fallback_entries = srcsets.pop(fallback.mimetype)
+    return ProcessedImage(
+        width=info.width,
+        height=info.height,
+        # The middle width is a sensible default for browsers that ignore the `srcset`.
+        src=fallback_entries[len(fallback_entries) // 2].split(" ")[0],
+        srcset=", ".join(fallback_entries),
+        link=fallback_entries[-1].split(" ")[0],
+        sources={k: ", ".join(v) for k, v in srcsets.items()},
+    )
@@ -0,0 +1,138 @@
+"""Minification of the rendered HTML before it is written and uploaded.
+
+The minification is conservative so the page looks exactly the same afterward:
+- Whitespace is collapsed, but line breaks are kept where WordPress would turn them into `<br>` or `<p>`.
+- The embedded CSS is stripped of comments and unnecessary whitespace.
+- Inline styles are compacted (`"margin-left: 4px; "` becomes `"margin-left:4px"`).
+- Empty `style` and `class` attributes are dropped.
+"""
+
+import re
+from dataclasses import dataclass
+
+_STYLE_ELEMENT = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.DOTALL | re.IGNORECASE)
+# Quoted attribute values are matched as a whole, so they may contain any character (including `>`).
+_QUOTED = r"""(?:"[^"]*"|'[^']*')"""
+_MARKUP = re.compile(
+    rf"""(<[a-zA-Z](?:[^>"']|{_QUOTED})*>|</[^>]*>|<!--.*?-->)""", re.DOTALL
+)
+_TAG_NAME = re.compile(r"<[a-zA-Z][^\s/>]*")
+_ATTRIBUTE = re.compile(rf"""(\s+)([^\s"'>/=]+)(?:\s*=\s*({_QUOTED}|[^\s"'>]+))?""")
+_WHITESPACE = re.compile(r"\s+")
+# Semicolons in quotes or parentheses (e.g. `url('a;b')`) do not end a declaration.
+_DECLARATION = rf"""(?:[^;"'()]|{_QUOTED}|\((?:[^()"']|{_QUOTED})*\))*"""
+_STYLE = re.compile(rf"{_DECLARATION}(?:;{_DECLARATION})*")
+_STYLE_DECLARATION = re.compile(_DECLARATION)
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON = re.compile(r":\s+")
+
+
+@dataclass(kw_only=True)
+class MinifyResult:
+    """The minified HTML and the sizes (in bytes) before and after the minification."""
+
+    html: str
+    original_size: int
+    minified_size: int
+
+    @property
+    def saved(self) -> int:
+        """The amount of bytes saved by the minification."""
+        return self.original_size - self.minified_size
+
+
+def minify_css(css: str) -> str:
+    """Removes comments and all whitespace that is not required from the `css`."""
+    css = _CSS_COMMENT.sub("", css)
+    css = _WHITESPACE.sub(" ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    css = _CSS_COLON.sub(":", css)
+    # The last declaration of a block does not need a terminating semicolon.
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def compact_style(style: str) -> str:
+    """Compacts an inline style definition like `"margin-left: 4px; "` to `"margin-left:4px"`.
+    Quoted strings are kept as they are. A style with unbalanced quotes or parentheses is kept entirely."""
+    if not _STYLE.fullmatch(style):
+        return style
+    declarations = list()
+    for declaration in _STYLE_DECLARATION.findall(style):
+        prop, sep, value = declaration.partition(":")
+        if not sep:
+            continue
+        if "'" not in value and '"' not in value:
+            value = _WHITESPACE.sub(" ", value)
+        declarations.append(f"{prop.strip()}:{value.strip()}")
+    return ";".join(declarations)
+
+
+def _collapse_whitespace(whitespace: str) -> str:
+    """Collapses a run of whitespace to its shortest form with the same meaning for WordPress.
+    WordPress turns single line breaks into `<br>` and double line breaks into paragraphs,
+    so line breaks are kept and only the indentation around them is removed."""
+    line_breaks = whitespace.count("\n")
+    if line_breaks == 0:
+        return " "
+    return "\n" * min(line_breaks, 2)
+
+
+def _minify_attribute(match: re.Match) -> str:
+    """Compacts an inline style attribute and drops empty `style` and `class` attributes.
+    Any other attribute is kept as it is."""
+    name, value = match[2].lower(), match[3]
+    quoted = value is not None and value[0] in "\"'"
+    unquoted = value[1:-1] if quoted else value
+    if name in ("style", "class") and not unquoted:
+        return ""
+    if name == "style":
+        # Keep the quotes of the value, as it may contain the other kind of quotes.
+        quote = value[0] if quoted else '"'
+        return f"{match[1]}style={quote}{compact_style(unquoted)}{quote}"
+    return match[0]
+
+
+def _minify_tag(tag: str) -> str:
+    """Compacts the inline style of a single opening `tag` and drops its empty attributes."""
+    name = _TAG_NAME.match(tag)[0]
+    return name + _ATTRIBUTE.sub(_minify_attribute, tag[len(name) :])
+
+
+def _minify_markup(html: str) -> str:
+    """Minifies `html` that does not contain any <style> element."""
+    # Splitting with a group alternates text (at even indices) and markup (at odd indices).
+    parts = _MARKUP.split(html)
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            if not part.startswith(("</", "<!--")):
+                parts[i] = _minify_tag(part)
+        elif part.isspace() and 0 < i < len(parts) - 1:
+            # Whitespace between tags is only kept if it does not contain a line break.
+            # Line breaks between tags stem from formatting (e.g. of the `head.html`)
+            # and would otherwise be turned into empty paragraphs by WordPress.
+            parts[i] = "" if "\n" in part else " "
+        else:
+            parts[i] = _WHITESPACE.sub(lambda m: _collapse_whitespace(m[0]), part)
+    return "".join(parts)
+
+
+def minify_html(html: str) -> MinifyResult:
+    """Minifies the rendered `html` of a page.
+    The content of <style> elements is minified as CSS, everything else as markup."""
+    parts = list()
+    last_end = 0
+    for match in _STYLE_ELEMENT.finditer(html):
+        parts.append(_minify_markup(html[last_end : match.start()]))
+        parts.append(_minify_tag(match[1]) + minify_css(match[2]) + match[3])
+        last_end = match.end()
+    parts.append(_minify_markup(html[last_end:]))
+
+    minified = "".join(parts)
+    return MinifyResult(
+        html=minified,
+        original_size=len(html.encode("utf-8")),
+        minified_size=len(minified.encode("utf-8")),
+    )
@@ -0,0 +1,87 @@
+"""Writing the rendered pages without ever losing the last complete output.
+
+A full render writes into a staging folder next to `./database/rendered`, which replaces the output only when all
+pages were rendered successfully. If the render fails, the previous output stays as it is.
+Pages that did not change are hard-linked from the previous output instead of being written again.
+Single pages are written to a temporary file first and then moved over the old file, so they are never partial.
+"""
+
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from src.util.metrics import METRICS
+
+
+def _get_sibling(folder: Path, suffix: str) -> Path:
+    """Returns the path next to the `folder` with the `suffix` appended to its name."""
+    return folder.with_name(folder.name + suffix)
+
+
+def recover_output(folder: Path) -> None:
+    """Restores the previous output if a swap (See `staged_output()`) was interrupted after it was moved aside."""
+    previous = _get_sibling(folder, ".previous")
+    if not folder.exists() and previous.exists():
+        os.replace(previous, folder)
+        print(f"Restored the previous output in {folder}")
+
+
+def write_page(file: Path, html: str, previous: Path | None = None) -> bool:
+    """Writes the `html` to the `file`, reusing the `previous` version of the file if it has the same content.
+
+    :param previous:
+        The same page in the previous output. Defaults to the `file` itself.
+    :returns:
+        Whether the content changed.
+    """
+    if previous is None:
+        previous = file
+    data = html.encode("utf-8")
+
+    if previous.exists() and previous.read_bytes() == data:
+        METRICS.count("pages_unchanged")
+        if previous == file:
+            return False
+        try:
+            os.link(previous, file)
+            return False
+        except OSError:
+            # E.g. the file system does not support hard links.
+            pass
+
+    # E.g. a single page is rendered before the first full render.
+    file.parent.mkdir(parents=True, exist_ok=True)
+    temp = _get_sibling(file, ".tmp")
+    with open(temp, "wb") as stream:
+        stream.write(data)
+    os.replace(temp, file)
+    return True
+
+
+@contextmanager
+def staged_output(folder: Path) -> Iterator[Path]:
+    """Yields an empty staging folder to write the complete output to.
+    When the enclosed block succeeds, the staging folder replaces the `folder`.
+    Otherwise, the staging folder is removed and the `folder` is left as it is."""
+    recover_output(folder)
+    staging = _get_sibling(folder, ".staging")
+    # Remove leftovers of a crashed run.
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # A folder cannot be replaced in a single step, so the old one is moved aside first.
+    # If this is interrupted in between, `recover_output()` restores the old one.
+    previous = _get_sibling(folder, ".previous")
+    shutil.rmtree(previous, ignore_errors=True)
+    if folder.exists():
+        os.replace(folder, previous)
+    os.replace(staging, folder)
+    shutil.rmtree(previous, ignore_errors=True)
@@ -0,0 +1,152 @@
+"""Breakdown of the size of each rendered page and checks against byte budgets.
+
+The size of a page is attributed to the top-level parts it is built from:
+- `head`: The embedded `<head>` with the font and icon links.
+- `style`: The embedded stylesheet.
+- The tag of each element of the body and appendix (e.g. `allEventDates`, `contactData`).
+  Multiple elements with the same tag are summed up.
+- `wrapper`: The `<div>` around the page.
+- `stages`: The bytes added or removed by the optional stages (e.g. minification) in total,
+  as they are applied to the whole page.
+
+A report of all pages is written to `./database/page_weights.json` after every render.
+"""
+
+import argparse
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from util.path import Files
+
+
+def get_size(html: str) -> int:
+    """Returns the size of the `html` in bytes, as it is stored and uploaded."""
+    return len(html.encode("utf-8"))
+
+
+@dataclass(kw_only=True)
+class PageWeight:
+    """The size of a rendered page in bytes and its breakdown by top-level part."""
+
+    page_id: str
+    size: int
+    parts: dict[str, int]
+    """The bytes of each part, sorted by size. They sum up to the `size`."""
+
+    @classmethod
+    def from_parts(cls, page_id: str, parts: list[tuple[str, str]], html: str) -> "PageWeight":
+        """Creates the weight of the final `html` from the `(name, html)` `parts` it was rendered from."""
+        sizes = Counter()
+        for name, part in parts:
+            sizes[name] += get_size(part)
+        size = get_size(html)
+        if size != sizes.total():
+            sizes["stages"] = size - sizes.total()
+        return cls(
+            page_id=page_id,
+            size=size,
+            parts=dict(sorted(sizes.items(), key=lambda p: p[1], reverse=True)),
+        )
+
+
+@dataclass(kw_only=True)
+class WeightBudget:
+    """The maximum amount of bytes of the pages and their parts."""
+
+    page: int | None = None
+    """The maximum size of each page or `None` if the size is not limited."""
+    parts: dict[str, int] = field(default_factory=dict)
+    """The maximum size of the parts by their name (See `PageWeight.parts`)."""
+    enforce: bool = False
+    """Whether pages over the budget fail the render."""
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser) -> None:
+        """Adds the command line arguments for the budget to the `parser`."""
+        parser.add_argument(
+            "--page-budget",
+            type=int,
+            metavar="BYTES",
+            help="Report pages that are larger than this.",
+        )
+        parser.add_argument(
+            "--part-budget",
+            action="append",
+            default=[],
+            metavar="PART=BYTES",
+            help="Report pages where a part (e.g. `style` or `allEventDates`) is larger than this. "
+            "Can be passed multiple times.",
+        )
+        parser.add_argument(
+            "--enforce-budget",
+            action="store_true",
+            help="Fail the render if any page is over the budget.",
+        )
+
+    @classmethod
+    def from_arguments(cls, args: argparse.Namespace) -> "WeightBudget":
+        """Creates the budget from the arguments added by `add_arguments()`.
+
+        :raises ValueError:
+            When a part budget is not formatted as `PART=BYTES`."""
+        parts = dict()
+        for budget in args.part_budget:
+            name, sep, size = budget.partition("=")
+            if not sep or not size.isdigit():
+                raise ValueError(f'Invalid part budget "{budget}", expected PART=BYTES.')
+            parts[name] = int(size)
+        return cls(page=args.page_budget, parts=parts, enforce=args.enforce_budget)
+
+    def get_violations(self, weight: PageWeight) -> list[str]:
+        """Returns a description of each limit the page of the `weight` exceeds."""
+        violations = list()
+        if self.page is not None and weight.size > self.page:
+            violations.append(f"page is {weight.size} bytes (budget {self.page})")
+        for name, budget in self.parts.items():
+            size = weight.parts.get(name, 0)
+            if size > budget:
+                violations.append(f"{name} is {size} bytes (budget {budget})")
+        return violations
+
+
+def write_report(
+    weights: list[PageWeight],
+    budget: WeightBudget,
+    file: Path = Files.page_weights,
+) -> None:
+    """Writes the `weights` of all pages, the totals of each part and all budget violations as JSON."""
+    totals = Counter()
+    for weight in weights:
+        totals.update(weight.parts)
+    report = {
+        "pages": [
+            {"page_id": w.page_id, "size": w.size, "parts": w.parts}
+            for w in sorted(weights, key=lambda w: w.size, reverse=True)
+        ],
+        "parts": dict(totals.most_common()),
+        "budget": {"page": budget.page, "parts": budget.parts},
+        "over_budget": {
+            w.page_id: violations
+            for w in weights
+            if (violations := budget.get_violations(w))
+        },
+    }
+    with open(file, "w", encoding="utf-8") as stream:
+        json.dump(report, stream, indent=2)
+
+
+def check_budget(weights: list[PageWeight], budget: WeightBudget) -> None:
+    """Prints all pages that are over the `budget`.
+
+    :raises ValueError:
+        When any page is over the budget and the budget is enforced."""
+    over_budget = 0
+    for weight in sorted(weights, key=lambda w: w.page_id):
+        violations = budget.get_violations(weight)
+        if violations:
+            over_budget += 1
+            print(f"Page {weight.page_id} is over budget: {', '.join(violations)}")
+    if over_budget and budget.enforce:
+        raise ValueError(f"{over_budget} pages are over budget.")
@@ -2,73 +2,159 @@
 
 This module dynamically parses any XML element by using varius parsers decorated with `element_parser`,
 which in turn can be accessed via `parse_element` to return the HTML rendered by the passed element.
+Parsers of data-heavy elements and of other packages are registered lazily (See `element_registry.py`).
 """
 
-import shutil
+import argparse
 import xml.etree.ElementTree as ETree
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable
+from typing import Iterable
 
-from tinyhtml import SupportsRender
+from tinyhtml import SupportsRender, raw, render
 
 import src.elements.constants as const
 import src.elements.templates as tmpl
 from elements.templates import horizontal_line
-from generation.dedicated.all_pages import (
-    generate_course_list_from_database,
-    generate_aux_list_from_database,
-)
-from src.generation.database_parse import CONTACTS, LOCATIONS, get_style, get_head
-from src.generation.dedicated.all_event_dates import (
-    generate_date_tables_from_database,
+from src.generation.css_prune import get_page_usage, prune_css
+from src.generation.database_parse import (
+    CONTACTS,
+    LOCATIONS,
+    get_style,
+    get_head,
+    get_stylesheet,
 )
+from src.generation.element_registry import ELEMENT_PARSERS, get_required_tags
+from src.generation.fragment_cache import FRAGMENT_CACHE, get_element_key
+from src.generation.icons import inline_icons
+from src.generation.images import is_local_image, process_image, IMAGE_SIZES
+from src.generation.minify import minify_html
+from src.generation.output import recover_output, staged_output, write_page
+from src.generation.page_weight import PageWeight, WeightBudget, check_budget, write_report
+from src.util.metrics import METRICS
 from src.util.tinyhtml_extended import h, H
 from util.path import get_page_file_name, get_page_files, Folders
 
 
+@dataclass(kw_only=True)
+class RenderOptions:
+    """Optional stages that are applied to the rendered HTML before it is stored."""
+
+    minify: bool = False
+    """Whether to minify the HTML (See `minify_html()`)."""
+    prune_css: bool = False
+    """Whether to only embed the CSS rules that apply to the page (See `prune_css()`)."""
+    inline_icons: bool = False
+    """Whether to replace the icon font with inline SVGs (See `inline_icons()`)."""
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser) -> None:
+        """Adds a command line flag for each option to the `parser`."""
+        parser.add_argument(
+            "--minify",
+            action="store_true",
+            help="Minify the rendered HTML and report the bytes saved per page.",
+        )
+        parser.add_argument(
+            "--prune-css",
+            action="store_true",
+            help="Only embed the CSS rules that apply to each page.",
+        )
+        parser.add_argument(
+            "--inline-icons",
+            action="store_true",
+            help="Replace the icon font with inline SVGs.",
+        )
+
+    @classmethod
+    def from_arguments(cls, args: argparse.Namespace) -> "RenderOptions":
+        """Creates the options from the flags added by `add_arguments()`."""
+        return cls(
+            minify=args.minify,
+            prune_css=args.prune_css,
+            inline_icons=args.inline_icons,
+        )
+
+
 def parse_xml(file: str | Path) -> ETree.Element:
     """Returns the root of the XML `file`."""
+    METRICS.count("page_def_parses")
     tree = ETree.parse(file)
     return tree.getroot()
 
 
-_ELEMENT_PARSERS: dict[str, Callable[[ETree.Element], SupportsRender]] = {
-    "allEventDates": generate_date_tables_from_database,
-    "allCourses": generate_course_list_from_database,
-    "allAux": generate_aux_list_from_database,
-}
-
-
-def element_parser(*tags: str):
-    """Decorated elements will be registered in `ELEMENT_PARSERS` under all `tags`."""
+def element_parser(
+    *tags: str,
+    reads: Iterable[str] | None = None,
+    memoize: bool = False,
+    children: str | None = None,
+):
+    """Decorated elements will be registered in `ELEMENT_PARSERS` under all `tags`.
+
+    :param reads:
+        All data in `DATA_VERSIONS` the parser itself (without its children) reads.
+        `None` if it reads any other data (e.g. image files), so no element containing it is memoized.
+    :param memoize:
+        Whether the rendered HTML of the elements will be memoized in the `FRAGMENT_CACHE`.
+        It is cached by the versions of the data all parsers in the subtree read,
+        so the cache is invalidated when that data changes (See `ElementRegistry.get_reads()`).
+    :param children:
+        The `findall()` path of the children the parser renders with `parse_element()`,
+        so the parsers a page needs are known before it is rendered (See `get_required_tags()`)."""
 
     def inner(func):
         """Register the `func` under all `tags`."""
         for tag in tags:
-            _ELEMENT_PARSERS[tag] = func
+            ELEMENT_PARSERS.register(
+                tag, func, reads=reads, memoize=memoize, children=children
+            )
         return func
 
     return inner
 
 
-def convert_to_html(root: ETree.Element) -> str:
+def convert_to_parts(
+    root: ETree.Element, options: RenderOptions = RenderOptions()
+) -> list[tuple[str, str]]:
+    """Converts the page definition into the HTML of its top-level parts as `(name, html)`.
+    Joined in order, the parts form the complete HTML including the necessary head and style
+    (See `PageWeight` for the names)."""
+    elements = get_page_elements(root)
+    # Import the parsers the page needs before rendering, so the imports are not timed as part of an element.
+    ELEMENT_PARSERS.preload(get_required_tags(elements))
+
+    # The content is rendered first so the style can be tailored to it.
+    content = [(e.tag, render(parse_element(e))) for e in elements]
+
+    if options.prune_css:
+        usage = get_page_usage("".join(html for _, html in content))
+        stylesheet = prune_css(get_stylesheet(), usage)
+        style = h("style")(stylesheet) if stylesheet else None
+    else:
+        style = get_style()
+
+    return [
+        ("wrapper", "<div>"),
+        # Get the meta elements.
+        ("head", render(get_head())),
+        ("style", render(style)),
+        *content,
+        ("wrapper", "</div>"),
+    ]
+
+
+def convert_to_html(root: ETree.Element, options: RenderOptions = RenderOptions()) -> str:
     """Converts the page definition into a complete HTML string including the necessary head and style."""
-    body = root.find("body")
-    appendix = root.find("appendix")
+    return "".join(html for _, html in convert_to_parts(root, options))
 
-    return h("div")(
-        # Get the meta elements.
-        get_head(),
-        get_style(),
-        # Concatenate the body.
-        (parse_element(e) for e in body),
-        # Concatenate the appendix.
-        (
-            (parse_element(e) for e in get_appendix_elements(appendix))
-            if appendix
-            else None
-        ),
-    ).render()
+
+def get_page_elements(root: ETree.Element) -> list[ETree.Element]:
+    """Returns the top-level elements of the page def `root` in the order they are rendered."""
+    elements = list(root.find("body"))
+    appendix = root.find("appendix")
+    if appendix:
+        elements += get_appendix_elements(appendix)
+    return elements
 
 
 def get_appendix_elements(appendix: ETree.Element) -> list[ETree.Element]:
@@ -78,6 +164,7 @@ def get_appendix_elements(appendix: ETree.Element) -> list[ETree.Element]:
         for t in [
             # Show the most relevant information first.
             "eventData",
+            "courseSchedule",
             "ageData",
             "registrationData",
             "contactData",
@@ -89,54 +176,87 @@ def get_appendix_elements(appendix: ETree.Element) -> list[ETree.Element]:
 
 def parse_element(element: ETree.Element) -> SupportsRender:
     """Parse any element based on its tag.
-    This accesses the parsers registered in `ELEMENT_PARSERS`."""
-    return _ELEMENT_PARSERS[element.tag](element)
+    This accesses the parsers registered in `ELEMENT_PARSERS`.
+    Elements of memoized parsers are only rendered once per identical subtree."""
+    parser = ELEMENT_PARSERS.get(element.tag)
+    reads = ELEMENT_PARSERS.get_memoized_reads(element)
+    if reads is None:
+        METRICS.count("element_parses")
+        return parser(element)
+
+    key = get_element_key(element, reads)
+    html = FRAGMENT_CACHE.get(key)
+    if html is None:
+        METRICS.count("element_parses")
+        html = render(parser(element))
+        FRAGMENT_CACHE.put(key, html)
+    return raw(html)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("opener")
+@element_parser("opener", reads=[])
 def parse(element: ETree.Element) -> H:
     return tmpl.opener(element.text)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("para")
+@element_parser("para", reads=[])
 def parse(element: ETree.Element) -> H:
     return h("p")(element.text)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("div")
+@element_parser("div", reads=[])
 def parse(element: ETree.Element) -> H:
     return h("div")(element.text)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("header")
+@element_parser("header", reads=[])
 def parse(element: ETree.Element) -> H:
     return tmpl.header(element.text)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("largeHeader")
+@element_parser("largeHeader", reads=[])
 def parse(element: ETree.Element) -> H:
     return tmpl.large_header(element.text)
 
 
+def parse_image(element: ETree.Element, *, center: bool) -> H:
+    """Renders an image tag.
+    Local images are embedded in multiple widths and formats, any other image is embedded by its link."""
+    source = element.text.strip()
+    if not is_local_image(source):
+        return tmpl.image(element.text, center=center)
+
+    image = process_image(source)
+    return tmpl.responsive_image(
+        image.link,
+        src=image.src,
+        srcset=image.srcset,
+        sources=image.sources,
+        sizes=IMAGE_SIZES[center],
+        width=image.width,
+        height=image.height,
+        center=center,
+    )
+
+
 # noinspection PyMissingOrEmptyDocstring
 @element_parser("centerImage")
 def parse(element: ETree.Element) -> H:
-    return tmpl.image(element.text, center=True)
+    return parse_image(element, center=True)
 
 
 # noinspection PyMissingOrEmptyDocstring
 @element_parser("sideImage")
 def parse(element: ETree.Element) -> H:
-    return tmpl.image(element.text, center=False)
+    return parse_image(element, center=False)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("ul", "ol")
+@element_parser("ul", "ol", reads=[], children="li")
 def parse(element: ETree.Element) -> H:
     return h(element.tag, style={"margin-bottom": 4})(
         parse_element(e) for e in element.findall("li")
@@ -144,19 +264,19 @@ def parse(element: ETree.Element) -> H:
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("li")
+@element_parser("li", reads=[])
 def parse(element: ETree.Element) -> H:
     return h("li")(element.text)
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("groupFull")
+@element_parser("groupFull", reads=[])
 def parse(_: ETree.Element) -> H:
     return const.GROUP_FULL
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("contactData")
+@element_parser("contactData", reads=[], memoize=True, children="*")
 def parse(element: ETree.Element) -> H:
     return h("div")(
         const.CONTACT_HEADER,
@@ -167,7 +287,7 @@ def parse(element: ETree.Element) -> H:
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("registrationData")
+@element_parser("registrationData", reads=[], memoize=True, children="*")
 def parse(element: ETree.Element) -> H:
     return h("div")(
         const.REGISTRATION_HEADER,
@@ -178,14 +298,14 @@ def parse(element: ETree.Element) -> H:
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("primaryMail")
+@element_parser("primaryMail", reads=[])
 def parse(element: ETree.Element) -> H:
     return h("div", style={"margin-top": 4, "margin-bottom": 4})(
         (tmpl.contact_mail(element.text, bold=True))
     )
 
 
-@element_parser("contact")
+@element_parser("contact", reads=["contacts"], memoize=True)
 def parse(element: ETree.Element) -> H:
     """Renders a single <contact> with their name and contact methods."""
     contact = CONTACTS[element.text]
@@ -206,7 +326,7 @@ def parse(element: ETree.Element) -> H:
     )
 
 
-@element_parser("eventData")
+@element_parser("eventData", reads=[], children="eventGroup")
 def parse(element: ETree.Element) -> H:
     """Renders any amount of <eventGroup>s within this <eventData>.
     Multiple groups are separated by a horizontal line."""
@@ -232,7 +352,7 @@ def parse(element: ETree.Element) -> H:
     )
 
 
-@element_parser("eventGroup")
+@element_parser("eventGroup", reads=[], children="eventLocation")
 def parse(element: ETree.Element) -> H:
     """Renders the <eventGroup> by showing all dates and the location associated with this group."""
     # Put the event dates into a list.
@@ -252,7 +372,7 @@ def parse(element: ETree.Element) -> H:
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("eventLocation")
+@element_parser("eventLocation", reads=["locations"], memoize=True)
 def parse(element: ETree.Element) -> H:
     key = element.text
     location = LOCATIONS[key]
@@ -262,36 +382,94 @@ def parse(element: ETree.Element) -> H:
 
 
 # noinspection PyMissingOrEmptyDocstring
-@element_parser("ageData")
+@element_parser("ageData", reads=[], memoize=True)
 def parse(element: ETree.Element) -> H:
     return h("div")(
         const.AGE_HEADER, h("div", style={"margin-left": 16})(tmpl.age(element.text))
     )
 
 
-def render_page_def(file: Path) -> None:
+def render_page_def(
+    file: Path,
+    options: RenderOptions = RenderOptions(),
+    *,
+    folder: Path = Folders.rendered,
+) -> PageWeight:
     """Renders the page data specified in the `file`
-    as HTML and stores the result in `./database/rendered/<pageId>.html`."""
+    as HTML and stores the result in `./database/rendered/<pageId>.html`.
+
+    :param folder:
+        The folder to store the result in instead, e.g. a staging folder.
+        An unchanged page is reused from `./database/rendered` (See `write_page()`).
+    :returns:
+        The size of the stored page and its breakdown."""
     # Read the data file.
     root = parse_xml(file)
     id_ = root.find("meta/pageId")
     if id_ is None or id_.text is None or id_.text.strip() == "":
         raise ValueError("Page ID is undefined.")
     # Convert the data.
-    html = convert_to_html(root)
+    parts = convert_to_parts(root, options)
+    html = "".join(part for _, part in parts)
+    if options.inline_icons:
+        result = inline_icons(html)
+        html = result.html
+        for klass, name in sorted(result.missing):
+            print(
+                f'Icon "{klass}/{name}" on page {id_.text} is not vendored, using the font instead.'
+            )
+    if options.minify:
+        result = minify_html(html)
+        html = result.html
+        print(
+            f"Minified page {id_.text}: Saved {result.saved} bytes "
+            f"({result.original_size} -> {result.minified_size})"
+        )
     # Store the data.
-    with open(
-        Folders.rendered / get_page_file_name(id_.text), "w", encoding="utf-8"
-    ) as stream:
-        stream.write(html)
+    file_name = get_page_file_name(id_.text)
+    write_page(folder / file_name, html, Folders.rendered / file_name)
+    METRICS.count("pages_rendered")
+    return PageWeight.from_parts(id_.text, parts, html)
+
+
+def render_page_defs(
+    files: list[Path],
+    options: RenderOptions = RenderOptions(),
+    budget: WeightBudget = WeightBudget(),
+    *,
+    folder: Path = Folders.rendered,
+) -> None:
+    """Renders the page data of all `files` into `./database/rendered` (or the `folder`).
+    Rendered pages of other files are kept as they are.
+    The size of the pages is written to `./database/page_weights.json` and checked against the `budget`.
+
+    :raises ValueError:
+        When the `budget` is enforced and any page is over it."""
+    recover_output(Folders.rendered)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    FRAGMENT_CACHE.reset_stats()
+    with METRICS.phase("render"):
+        weights = [render_page_def(page, options, folder=folder) for page in files]
+
+    METRICS.count("fragment_cache_hits", FRAGMENT_CACHE.hits)
+    METRICS.count("fragment_cache_misses", FRAGMENT_CACHE.misses)
+    print(
+        f"Fragment cache: {FRAGMENT_CACHE.hits} hits, {FRAGMENT_CACHE.misses} misses "
+        f"({FRAGMENT_CACHE.hit_rate:.0%} hit rate)"
+    )
+    write_report(weights, budget)
+    check_budget(weights, budget)
 
 
-def render_all_page_defs() -> None:
+def render_all_page_defs(
+    options: RenderOptions = RenderOptions(),
+    budget: WeightBudget = WeightBudget(),
+) -> None:
     """Renders all page data defined in the `./database/pages` folder.
-    This initially clears the folder where the files will be placed (`./database/rendered`)
+    The pages are rendered into a staging folder, which replaces `./database/rendered` only if all pages
+    were rendered successfully (and within an enforced `budget`), so rendered pages of removed page defs
+    are removed as well, but a failed render never leaves the output incomplete.
     """
-    shutil.rmtree(Folders.rendered)
-    Folders.rendered.mkdir()
-
-    for page in get_page_files():
-        render_page_def(page)
+    with staged_output(Folders.rendered) as staging:
+        render_page_defs(get_page_files(), options, budget, folder=staging)
@@ -0,0 +1,106 @@
+"""Selecting a subset of the page defs, including all pages that depend on them.
+
+Some elements render data of other pages, so these pages must be rendered again when the others change:
+- `<allCourses>` lists the titles of all course pages.
+- `<allAux>` lists the titles of all auxiliary pages.
+- `<allEventDates>` links the titles of all courses that have event dates.
+"""
+
+import fnmatch
+import xml.etree.ElementTree as ETree
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.generation.dedicated.all_event_dates import get_event_store
+from src.generation.dedicated.all_pages import get_metadata
+from src.util.metrics import METRICS
+from util.path import get_page_files
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class PageInfo:
+    """The metadata of a page def and all tags it uses."""
+
+    file: Path
+    page_id: str
+    title: str
+    page_type: str
+    tags: frozenset[str]
+
+
+def get_page_infos() -> list[PageInfo]:
+    """Returns the `PageInfo` of all page defs."""
+    infos = list()
+    for file in get_page_files():
+        title, page_id, page_type = get_metadata(file)
+        METRICS.count("page_def_parses")
+        root = ETree.parse(file).getroot()
+        infos.append(
+            PageInfo(
+                file=file,
+                page_id=page_id,
+                title=title,
+                page_type=page_type,
+                tags=frozenset(e.tag for e in root.iter()),
+            )
+        )
+    return infos
+
+
+def _matches(info: PageInfo, selector: str) -> bool:
+    """Whether the `selector` matches the page by its ID, or its file name as glob."""
+    return (
+        info.page_id == selector
+        or fnmatch.fnmatch(info.file.name, selector)
+        or fnmatch.fnmatch(info.file.stem, selector)
+    )
+
+
+def select_pages(
+    infos: list[PageInfo],
+    selectors: list[str],
+    page_types: list[str] | None = None,
+) -> set[PageInfo]:
+    """Returns all pages that match any of the `selectors` (See `_matches()`) or `page_types`.
+    If neither is defined, all pages are selected.
+
+    :raises ValueError:
+        When any selector does not match a single page, as this is most likely a typo."""
+    if not selectors and not page_types:
+        return set(infos)
+
+    selected = {i for i in infos if page_types and i.page_type in page_types}
+    for selector in selectors:
+        matches = {i for i in infos if _matches(i, selector)}
+        if not matches:
+            raise ValueError(f'No page matches "{selector}".')
+        selected |= matches
+    return selected
+
+
+def _affects(changed: PageInfo, page: PageInfo, scheduled_courses: set[str]) -> bool:
+    """Whether a change of the `changed` page affects the rendering of the `page`."""
+    return (
+        ("allCourses" in page.tags and changed.page_type == "course")
+        or ("allAux" in page.tags and changed.page_type == "aux")
+        or ("allEventDates" in page.tags and changed.page_id in scheduled_courses)
+    )
+
+
+def get_dependents(infos: list[PageInfo], selected: set[PageInfo]) -> set[PageInfo]:
+    """Returns all pages that are not `selected` but are affected by changes to the `selected` pages."""
+    scheduled_courses = {
+        ed.course_id for ed in get_event_store().event_dates if ed.course_id is not None
+    }
+
+    dependents = set()
+    pending = set(selected)
+    while pending:
+        changed = pending.pop()
+        for page in infos:
+            if page in selected or page in dependents:
+                continue
+            if _affects(changed, page, scheduled_courses):
+                dependents.add(page)
+                pending.add(page)
+    return dependents
@@ -0,0 +1,70 @@
+"""A local cache of the catalog of all pages in WordPress.
+
+The catalog lists the ID, title, slug and modification time of every page, so the page defs can be checked
+against WordPress without a request per page (and without network access at all, as long as the cache is fresh).
+It is stored in `./database/page_catalog.json` and synced with `sync_catalog()` in `upload.py`.
+"""
+
+import datetime
+import json
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from util.path import Files
+
+CATALOG_TTL = datetime.timedelta(hours=24)
+"""How long the cached catalog is used before it is synced again."""
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class CatalogPage:
+    """A page as listed by WordPress."""
+
+    page_id: str
+    title: str
+    """The rendered title, as it is compared to the title in the page def."""
+    slug: str
+    modified: str
+    """The time of the last modification in UTC as ISO 8601."""
+
+
+@dataclass(kw_only=True)
+class PageCatalog:
+    """All pages in WordPress at the time of the sync."""
+
+    pages: dict[str, CatalogPage]
+    """The pages by their ID."""
+    synced: str
+    """The time of the sync in UTC as ISO 8601."""
+
+    def get_age(self) -> datetime.timedelta:
+        """Returns the time since the catalog was synced."""
+        synced = datetime.datetime.fromisoformat(self.synced)
+        return datetime.datetime.now(datetime.timezone.utc) - synced
+
+    def is_stale(self, ttl: datetime.timedelta = CATALOG_TTL) -> bool:
+        """Whether the catalog is older than the `ttl`."""
+        return self.get_age() > ttl
+
+    @classmethod
+    def load(cls, file: Path = Files.page_catalog) -> "PageCatalog | None":
+        """Returns the catalog cached in the `file` or `None` if there is no (readable) cache."""
+        try:
+            with open(file, encoding="utf-8") as stream:
+                data = json.load(stream)
+            return cls(
+                pages={p["page_id"]: CatalogPage(**p) for p in data["pages"]},
+                synced=data["synced"],
+            )
+        except (OSError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+
+    def save(self, file: Path = Files.page_catalog) -> None:
+        """Caches the catalog in the `file`."""
+        data = {
+            "synced": self.synced,
+            "pages": [asdict(p) for p in sorted(self.pages.values(), key=lambda p: int(p.page_id))],
+        }
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(file, "w", encoding="utf-8") as stream:
+            json.dump(data, stream, indent=2, ensure_ascii=False)
@@ -0,0 +1,92 @@
+"""Checks whether the page defs and the rendered pages still match the pages in WordPress ("drift").
+
+All checks run against the page catalog (See `catalog.py`), so they do not need a request per page:
+- Every page def must have a page in WordPress with the same title.
+- A page must not be modified in WordPress after it was last uploaded, as the next upload would overwrite the changes.
+- Every page linked in the rendered pages (See `get_page_url()`) must exist in WordPress.
+"""
+
+import datetime
+import re
+from dataclasses import dataclass
+
+from src.generation.database_parse import get_title_and_id
+from upload.catalog import PageCatalog
+from upload.journal import Status, read_entries
+from src.upload.upload import get_page_url
+from util.path import Files, Folders, get_page_file_name, get_page_files
+
+MODIFIED_TOLERANCE = datetime.timedelta(minutes=1)
+"""The time a page may be modified after its upload was recorded, to allow for clock differences to the server."""
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class Drift:
+    """A difference between a page def and its page in WordPress."""
+
+    page_id: str
+    message: str
+
+
+def _get_last_uploads() -> dict[str, datetime.datetime]:
+    """Returns the time of the last successful upload of each page by its ID."""
+    return {
+        # The journal uses the local time.
+        e.page_id: datetime.datetime.fromisoformat(e.time).astimezone(datetime.timezone.utc)
+        for e in read_entries(Files.upload_journal)
+        if e.status == Status.done
+    }
+
+
+def _get_linked_page_ids(html: str) -> set[str]:
+    """Returns the IDs of all pages linked in the `html`."""
+    prefix, suffix = get_page_url("\0").split("\0")
+    return set(re.findall(f'href="{re.escape(prefix)}([^"]+){re.escape(suffix)}"', html))
+
+
+def get_drift(catalog: PageCatalog) -> list[Drift]:
+    """Returns all differences between the page defs (and their rendered pages) and the `catalog`."""
+    last_uploads = _get_last_uploads()
+    drift = list()
+    for file in get_page_files():
+        title, page_id = get_title_and_id(file)
+
+        page = catalog.pages.get(page_id)
+        if page is None:
+            drift.append(
+                Drift(
+                    page_id=page_id,
+                    message=f'No page exists in WordPress (Defined in "{file.name}").',
+                )
+            )
+            continue
+        if page.title != title:
+            drift.append(
+                Drift(
+                    page_id=page_id,
+                    message=f'The title in WordPress is "{page.title}", but "{title}" is defined.',
+                )
+            )
+
+        uploaded = last_uploads.get(page_id)
+        modified = datetime.datetime.fromisoformat(page.modified)
+        if uploaded is not None and modified > uploaded + MODIFIED_TOLERANCE:
+            drift.append(
+                Drift(
+                    page_id=page_id,
+                    message=f"The page was modified in WordPress at {page.modified} after its last upload at "
+                    f"{uploaded.isoformat()}. The next upload will overwrite these changes.",
+                )
+            )
+
+        rendered = Folders.rendered / get_page_file_name(page_id)
+        if rendered.exists():
+            html = open(rendered, encoding="utf-8").read()
+            for linked_id in sorted(_get_linked_page_ids(html) - catalog.pages.keys()):
+                drift.append(
+                    Drift(
+                        page_id=page_id,
+                        message=f"The page links to page {linked_id}, which does not exist in WordPress.",
+                    )
+                )
+    return drift
@@ -0,0 +1,68 @@
+"""Checking that the derived images embedded in the rendered pages are served under the `IMAGE_BASE_URL`.
+
+Local images are converted into `./database/images_derived` (See `images.py`), which must be published separately,
+e.g. with `rsync -a database/images_derived/ <server>:<folder served under IMAGE_BASE_URL>`.
+Pages are only uploaded once all derived images they embed are served, so they never link to missing images.
+
+The derived images are named after the hash of their source, so a published image never changes.
+Each image is therefore only requested once and then listed in `./database/published_images.txt`.
+"""
+
+import re
+from pathlib import Path
+
+import requests
+
+from src.generation.images import IMAGE_BASE_URL, get_image_url
+from src.util.metrics import METRICS
+from util.path import Files
+
+
+def get_embedded_images(html: str) -> set[str]:
+    """Returns the file names of all derived images the `html` embeds."""
+    if IMAGE_BASE_URL is None:
+        return set()
+    prefix = re.escape(get_image_url(""))
+    return set(re.findall(prefix + r"([^\s\"',]+)", html))
+
+
+def _load_published(file: Path) -> set[str]:
+    """Returns the images listed in the `file` as published."""
+    try:
+        with open(file, encoding="utf-8") as stream:
+            return {line.strip() for line in stream if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def is_served(name: str) -> bool:
+    """Whether the derived image `name` is served under the `IMAGE_BASE_URL`."""
+    METRICS.count("http_requests")
+    res = requests.head(get_image_url(name), allow_redirects=True)
+    return res.ok
+
+
+def check_published_images(htmls: list[str], file: Path = Files.published_images) -> None:
+    """Asserts that all derived images embedded in the `htmls` are served under the `IMAGE_BASE_URL`.
+    Images that are served are listed in the `file`, so they are not requested again.
+
+    :raises ValueError:
+        When any image is not served."""
+    embedded = set().union(*(get_embedded_images(html) for html in htmls))
+    published = _load_published(file)
+    unchecked = sorted(embedded - published)
+    if not unchecked:
+        return
+
+    served = [name for name in unchecked if is_served(name)]
+    if served:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(file, "a", encoding="utf-8") as stream:
+            stream.writelines(name + "\n" for name in served)
+
+    missing = sorted(set(unchecked) - set(served))
+    if missing:
+        raise ValueError(
+            f"{len(missing)} derived images are not served under {IMAGE_BASE_URL}, "
+            f"publish ./database/images_derived first: {', '.join(missing)}"
+        )
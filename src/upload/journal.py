@@ -0,0 +1,106 @@
+"""An append-only journal of the upload status of each page.
+
+Every upload run gets its own run ID and each page is recorded as "started" before and "done" after its upload.
+When a run fails partway through, it can be resumed by skipping all pages the journal already lists as "done"
+for the same content.
+"""
+
+import datetime
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from util.path import Files
+
+
+class Status:
+    """The states a page can be in during an upload run."""
+
+    started = "started"
+    done = "done"
+    failed = "failed"
+
+
+@dataclass(kw_only=True)
+class JournalEntry:
+    """A single line of the journal."""
+
+    run_id: str
+    page_id: str
+    content_hash: str
+    status: str
+    time: str
+
+
+def get_content_hash(content: str) -> str:
+    """Returns a stable hash of the `content` to detect whether a page changed between runs."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def read_entries(file: Path) -> list[JournalEntry]:
+    """Returns all entries in the journal `file` in the order they were written.
+    A missing file is treated as an empty journal.
+    A truncated last line (e.g. from a crash while writing) is ignored."""
+    if not file.exists():
+        return []
+
+    entries = list()
+    with open(file, encoding="utf-8") as stream:
+        for line in stream:
+            try:
+                entries.append(JournalEntry(**json.loads(line)))
+            except (json.JSONDecodeError, TypeError):
+                continue
+    return entries
+
+
+class UploadJournal:
+    """Records the upload status of all pages of one run.
+
+    :param run_id:
+        The run to record into.
+        Pass the ID of a previous run to continue it, otherwise a new run is started.
+    :param file:
+        The journal file. All runs are appended to the same file.
+    """
+
+    def __init__(self, run_id: str | None = None, *, file: Path = Files.upload_journal):
+        self.file = file
+        self.run_id = run_id if run_id is not None else uuid.uuid4().hex
+        self._done: set[tuple[str, str]] = {
+            (e.page_id, e.content_hash)
+            for e in read_entries(file)
+            if e.run_id == self.run_id and e.status == Status.done
+        }
+
+    @classmethod
+    def resume_last(cls, *, file: Path = Files.upload_journal) -> "UploadJournal":
+        """Continues the last run recorded in the `file`.
+        If the `file` does not contain any run yet, a new run is started."""
+        entries = read_entries(file)
+        run_id = entries[-1].run_id if entries else None
+        return cls(run_id, file=file)
+
+    def is_done(self, page_id: str, content_hash: str) -> bool:
+        """Whether the page has already been uploaded with exactly this content in this run."""
+        return (page_id, content_hash) in self._done
+
+    def record(self, page_id: str, content_hash: str, status: str) -> None:
+        """Appends the `status` of the page to the journal.
+        The line is flushed immediately so it survives a crash of the process."""
+        entry = JournalEntry(
+            run_id=self.run_id,
+            page_id=page_id,
+            content_hash=content_hash,
+            status=status,
+            time=datetime.datetime.now().isoformat(timespec="seconds"),
+        )
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "a", encoding="utf-8") as stream:
+            stream.write(json.dumps(asdict(entry)) + "\n")
+            stream.flush()
+
+        if status == Status.done:
+            self._done.add((page_id, content_hash))
@@ -1,12 +1,19 @@
 """Handling the API routes and uploading the data."""
+import datetime
 import os
+import time
+from pathlib import Path
 
 import requests
 from dotenv import load_dotenv
 from requests import auth
 
 from src.generation.database_parse import get_title_and_id
-from util.path import get_page_file_name, Folders, get_page_files
+from src.util.metrics import METRICS
+from upload.catalog import CATALOG_TTL, CatalogPage, PageCatalog
+from upload.image_check import check_published_images
+from upload.journal import UploadJournal, Status, get_content_hash
+from util.path import get_page_file_name, Folders, get_page_files, Files
 
 load_dotenv()
 
@@ -15,6 +22,13 @@ AUTH = auth.HTTPBasicAuth(
 )
 ORIGIN_URL =os.getenv("ORIGIN_URL")
 
+MAX_RETRIES = 2
+"""How often a request is repeated after a connection error or server error."""
+RETRY_DELAY = 1.0
+"""The seconds to wait before the first retry. The delay doubles with each retry."""
+CATALOG_PAGE_SIZE = 100
+"""The amount of pages requested at once when syncing the catalog (The maximum allowed by WordPress)."""
+
 def get_page_url(page_id: str) -> str:
     """Returns the URL to the page with the `page_id`."""
     return ORIGIN_URL + f"/?page_id={page_id}"
@@ -25,54 +39,188 @@ def get_api_url(page_id: str) -> str:
     return ORIGIN_URL + f"/wp-json/wp/v2/pages/{page_id}"
 
 
-def get_page_title(url: str) -> str:
-    """Returns the title in the response of the API `url`."""
-    res = requests.get(url)
-    res.raise_for_status()
-    return res.json()["title"]["rendered"]
+def get_pages_api_url() -> str:
+    """Returns the URL of the API that lists all pages."""
+    return ORIGIN_URL + "/wp-json/wp/v2/pages"
+
 
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """Sends the request and retries it on connection errors and server errors.
+    Only use this for idempotent requests.
 
-def validate_url_title(url: str, title: str) -> None:
-    """Asserts that the API `url` responds with the expected `title`.
+    :raises HTTPError:
+        When the request fails after all retries."""
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt > 0:
+            METRICS.count("http_retries")
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+        METRICS.count("http_requests")
+        try:
+            res = requests.request(method, url, **kwargs)
+        except requests.ConnectionError:
+            if attempt == MAX_RETRIES:
+                raise
+            continue
+        if res.status_code < 500 or attempt == MAX_RETRIES:
+            res.raise_for_status()
+            return res
+
+
+def fetch_catalog() -> PageCatalog:
+    """Fetches the catalog of all pages with one request per `CATALOG_PAGE_SIZE` pages.
+
+    :raises HTTPError:
+        When any API request fails."""
+    pages = dict()
+    page_number, total_pages = 1, 1
+    while page_number <= total_pages:
+        res = _request(
+            "GET",
+            get_pages_api_url(),
+            params={
+                "per_page": CATALOG_PAGE_SIZE,
+                "page": page_number,
+                "_fields": "id,title,slug,modified_gmt",
+            },
+        )
+        total_pages = int(res.headers.get("X-WP-TotalPages", 1))
+        for data in res.json():
+            page = CatalogPage(
+                page_id=str(data["id"]),
+                title=data["title"]["rendered"],
+                slug=data["slug"],
+                modified=data["modified_gmt"] + "+00:00",
+            )
+            pages[page.page_id] = page
+        page_number += 1
+
+    synced = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    return PageCatalog(pages=pages, synced=synced)
+
+
+def sync_catalog(file: Path = Files.page_catalog) -> PageCatalog:
+    """Fetches the catalog of all pages and caches it in the `file`.
+
+    :raises HTTPError:
+        When any API request fails."""
+    catalog = fetch_catalog()
+    catalog.save(file)
+    print(f"Synced the catalog of {len(catalog.pages)} pages")
+    return catalog
+
+
+def get_catalog(
+    *,
+    refresh: bool = False,
+    ttl: datetime.timedelta = CATALOG_TTL,
+    file: Path = Files.page_catalog,
+) -> PageCatalog:
+    """Returns the cached catalog of all pages.
+    It is synced first if it is not cached yet, older than the `ttl` or a `refresh` is requested.
+    If WordPress cannot be reached, an outdated cache is used anyway, so checks also work offline.
+
+    :raises ConnectionError:
+        When there is no cache and WordPress cannot be reached."""
+    catalog = PageCatalog.load(file)
+    if catalog is not None and not refresh and not catalog.is_stale(ttl):
+        return catalog
+    try:
+        return sync_catalog(file)
+    except requests.ConnectionError:
+        if catalog is None:
+            raise
+        print(f"Could not reach WordPress, using the catalog synced at {catalog.synced}")
+        return catalog
+
+
+def validate_title(page_id: str, title: str, catalog: PageCatalog) -> None:
+    """Asserts that the page with the `page_id` has the expected `title` in the `catalog`.
 
     :raises AssertionError:
         When the assertion failed."""
-    fetched_title = get_page_title(url)
-    assert get_page_title(url) == title, (
+    page = catalog.pages.get(page_id)
+    fetched_title = page.title if page is not None else None
+    assert fetched_title == title, (
         "The URL you tried to access does not have the matching title.\n"
         "This is a safety mechanism, to fix this, check that the ID is still correct and update the database with the correct title.\n",
         f'Fetched title: "{fetched_title}". Defined title: "{title}"',
     )
 
 
-def update_content(url: str, *, content: str, expected_title: str) -> None:
+def update_content(url: str, *, content: str) -> None:
     """Updates the page at the API `url` with the content.
-    Requires the `expected_title` to validate that the target page is the expected page.
+    Validate the title of the page first (See `validate_title()`).
 
     :raises HTTPError:
         When the API request fails."""
-    validate_url_title(url, expected_title)
     payload = {"content": content}
-    res = requests.put(url, json=payload, auth=AUTH)
-    res.raise_for_status()
+    # Replacing the content is idempotent, so it can safely be retried.
+    _request("PUT", url, json=payload, auth=AUTH)
+
+
+def _get_rendered_html(page: Path) -> str:
+    """Returns the rendered content of the `page`."""
+    _, page_id = get_title_and_id(page)
+    html_file = Folders.rendered / get_page_file_name(page_id)
+    return open(html_file, encoding="utf-8").read()
 
 
-def update_all_content() -> None:
+def _upload_page(page: Path, journal: UploadJournal, catalog: PageCatalog) -> None:
+    """Uploads the rendered content of the `page` unless the `journal` lists it as done."""
+    page_title, page_id = get_title_and_id(page)
+    html = _get_rendered_html(page)
+
+    content_hash = get_content_hash(html)
+    if journal.is_done(page_id, content_hash):
+        METRICS.count("pages_skipped")
+        return
+
+    journal.record(page_id, content_hash, Status.started)
+    start = time.perf_counter()
+    try:
+        validate_title(page_id, page_title, catalog)
+        update_content(get_api_url(page_id), content=html)
+    except Exception:
+        journal.record(page_id, content_hash, Status.failed)
+        METRICS.count("upload_failures")
+        raise
+    METRICS.observe("upload", time.perf_counter() - start)
+    METRICS.count("pages_uploaded")
+    METRICS.count("upload_bytes", len(html.encode("utf-8")))
+    journal.record(page_id, content_hash, Status.done)
+
+
+
+def update_all_content(*, resume: bool = False, pages: list[Path] | None = None) -> None:
     """Updates all pages that have a defined XML with their rendered content defined in "./generated".
      This expects the rendered content files to have the name `<pageId>.html`.
+     Each upload is recorded in the upload journal (`./database/upload_journal.jsonl`).
+
+     :param pages:
+        The page def files to upload. Defaults to all page defs.
+     :param resume:
+        Whether to continue the last run from the journal.
+        Pages that were already uploaded in that run with the same content will be skipped.
 
      :raises HTTPError:
         When any API request fails.
-        Note that any successful request until then will *not* be undone.
+        Note that any successful request until then will *not* be undone,
+        but the run can be continued with `resume`.
+     :raises ValueError:
+        When any derived image the pages embed is not published yet (See `check_published_images()`).
      """
-    for page in get_page_files():
-        page_title, page_id = get_title_and_id(page)
-
-        html_file = Folders.rendered / get_page_file_name(page_id)
-        html = open(html_file, encoding="utf-8").read()
-
-        update_content(get_api_url(page_id), content=html, expected_title=page_title)
-
+    journal = UploadJournal.resume_last() if resume else UploadJournal()
+
+    if pages is None:
+        pages = get_page_files()
+
+    with METRICS.phase("upload"):
+        # Pages must never link to derived images no server has.
+        check_published_images([_get_rendered_html(p) for p in pages])
+        # Always sync, so every page is validated against its current title.
+        catalog = sync_catalog()
+        for page in pages:
+            _upload_page(page, journal, catalog)
 
 if __name__ == "__main__":
     update_all_content()
@@ -0,0 +1,189 @@
+"""Machine-readable metrics of a build and upload run.
+
+During a run, the pipeline counts events (e.g. rendered pages, HTTP requests), measures the wall time of each phase
+and records the latency of each upload in the global `METRICS`.
+At the end of the run (See `record_run()`), they are written as:
+- JSON run report to `./database/run_report.json`.
+- Prometheus textfile to `./database/metrics.prom`, e.g. for the textfile collector of the node exporter.
+"""
+
+import datetime
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from util.path import Files
+
+PROMETHEUS_PREFIX = "website_builder"
+QUANTILES = (0.5, 0.95)
+COUNTERS = (
+    "pages_rendered",
+    "pages_uploaded",
+    "pages_skipped",
+    "upload_failures",
+    "upload_bytes",
+    "http_requests",
+    "http_retries",
+)
+"""Counters that are always reported, even if nothing was counted, so alerts do not depend on their existence."""
+
+
+def get_quantile(values: list[float], quantile: float) -> float:
+    """Returns the `quantile` (e.g. `0.95`) of the `values` using the nearest-rank method."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[max(math.ceil(quantile * len(ordered)) - 1, 0)]
+
+
+class RunMetrics:
+    """Counters, phase durations and latencies of a single run.
+    The metrics can safely be recorded by multiple threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Counter[str] = Counter()
+        self.phases: dict[str, float] = dict()
+        """The wall time of each phase in seconds."""
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        """All measured latencies in seconds by their name."""
+
+    def reset(self) -> None:
+        """Removes all recorded metrics, e.g. at the start of a run."""
+        with self._lock:
+            self.counters.clear()
+            self.phases.clear()
+            self.latencies.clear()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increases the counter `name` by the `amount`."""
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Records a latency of `seconds` under the `name`."""
+        with self._lock:
+            self.latencies[name].append(seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Measures the wall time of the enclosed code as phase `name`.
+        Repeated phases with the same name are summed up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def get_hit_rates(self) -> dict[str, float]:
+        """Returns the hit rate of each cache that has a `<cache>_hits` and `<cache>_misses` counter."""
+        rates = dict()
+        for name in self.counters:
+            if not name.endswith("_hits"):
+                continue
+            cache = name.removesuffix("_hits")
+            lookups = self.counters[name] + self.counters[f"{cache}_misses"]
+            rates[cache] = self.counters[name] / lookups if lookups else 0.0
+        return rates
+
+    def get_report(self, *, success: bool) -> dict:
+        """Returns all metrics as JSON-serializable report."""
+        with self._lock:
+            counters = dict.fromkeys(COUNTERS, 0) | self.counters
+            return {
+                "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "success": success,
+                "counters": dict(sorted(counters.items())),
+                "phases": dict(self.phases),
+                "hit_rates": self.get_hit_rates(),
+                "latencies": {
+                    name: {
+                        "count": len(values),
+                        "sum": sum(values),
+                        **{f"p{round(q * 100)}": get_quantile(values, q) for q in QUANTILES},
+                    }
+                    for name, values in self.latencies.items()
+                },
+            }
+
+    def get_prometheus(self, *, success: bool) -> str:
+        """Returns all metrics in the Prometheus text format.
+        As each run starts from zero, the counters are exposed as gauges."""
+        report = self.get_report(success=success)
+        lines = list()
+
+        def metric(name: str, kind: str, help_: str, samples: list[tuple[str, float]]) -> None:
+            """Add a metric with its `samples` as `(labels, value)`."""
+            name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+        metric("last_run_timestamp_seconds", "gauge", "The time the last run ended.", [("", time.time())])
+        metric("last_run_success", "gauge", "Whether the last run succeeded.", [("", int(success))])
+        for name, value in report["counters"].items():
+            metric(name, "gauge", f"The {name.replace('_', ' ')} of the last run.", [("", value)])
+        metric(
+            "phase_duration_seconds",
+            "gauge",
+            "The wall time of each phase of the last run.",
+            [(f'{{phase="{p}"}}', d) for p, d in report["phases"].items()],
+        )
+        metric(
+            "cache_hit_rate",
+            "gauge",
+            "The hit rate of each cache in the last run.",
+            [(f'{{cache="{c}"}}', r) for c, r in report["hit_rates"].items()],
+        )
+        for name, summary in report["latencies"].items():
+            samples = [(f'{{quantile="{q}"}}', summary[f"p{round(q * 100)}"]) for q in QUANTILES]
+            metric(f"{name}_latency_seconds", "summary", f"The latency of each {name}.", samples)
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}_latency_seconds_sum {summary['sum']}")
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}_latency_seconds_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _write_atomic(file: Path, content: str) -> None:
+    """Writes the `content` to a temporary file first and then replaces the `file`,
+    so readers (e.g. the node exporter) never see a partially written file."""
+    temp = file.with_name(file.name + ".tmp")
+    with open(temp, "w", encoding="utf-8") as stream:
+        stream.write(content)
+    os.replace(temp, file)
+
+
+METRICS = RunMetrics()
+"""The metrics of the current run."""
+
+
+@contextmanager
+def record_run(
+    *,
+    report_file: Path = Files.run_report,
+    prometheus_file: Path = Files.metrics,
+) -> Iterator[RunMetrics]:
+    """Records the metrics of the enclosed run and writes them when it ends, even if it fails.
+
+    :param report_file:
+        The file the JSON run report is written to.
+    :param prometheus_file:
+        The file the Prometheus metrics are written to.
+    """
+    METRICS.reset()
+    success = False
+    try:
+        with METRICS.phase("total"):
+            yield METRICS
+        success = True
+    finally:
+        _write_atomic(report_file, json.dumps(METRICS.get_report(success=success), indent=2))
+        _write_atomic(prometheus_file, METRICS.get_prometheus(success=success))
+        print(f"Metrics written to {report_file} and {prometheus_file}")
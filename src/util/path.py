@@ -7,9 +7,24 @@ class Folders:
     """Common folders used in the project."""
 
     res = Path() / "res"
+    icons = res / "icons"
     database = Path() / "database"
     rendered = database / "rendered"
     pages = database / "pages"
+    images = database / "images"
+    images_derived = database / "images_derived"
+    export = database / "export"
+
+
+class Files:
+    """Common files used in the project."""
+
+    upload_journal = Folders.database / "upload_journal.jsonl"
+    page_weights = Folders.database / "page_weights.json"
+    run_report = Folders.database / "run_report.json"
+    metrics = Folders.database / "metrics.prom"
+    page_catalog = Folders.database / "page_catalog.json"
+    published_images = Folders.database / "published_images.txt"
 
 
 def _is_valid_page_file(file: Path) -> bool: